@@ -4,6 +4,7 @@ from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_mail import Mail
 from flaskblog.config import Config
+from flaskblog.storage import Storage
 
 
 db = SQLAlchemy()
@@ -12,6 +13,7 @@ login_manager= LoginManager()
 login_manager.login_view = 'users.login'
 login_manager.login_message_category = 'info'
 mail = Mail()
+storage = Storage()
 
 
 
@@ -30,7 +32,7 @@ def create_app(config_class=Config):
         The configured Flask application instance.
     """
 	app = Flask(__name__)
-	app.config.from_object(Config)
+	app.config.from_object(config_class)
 
 	
 
@@ -39,6 +41,7 @@ def create_app(config_class=Config):
 	bcrypt.init_app(app)
 	login_manager.init_app(app)
 	mail.init_app(app)
+	storage.init_app(app)
 
 
 
@@ -9,3 +9,13 @@ class Config:
 	MAIL_USE_TLS = True# Using TLS encryption for email transport
 	MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
 	MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+	MAX_CONTENT_LENGTH = 2 * 1024 * 1024# Largest request body accepted, larger uploads are rejected with 413
+	MAX_PICTURE_DIMENSION = 4096# Largest width/height in pixels accepted for a profile picture
+	MAX_PICTURE_PIXELS = 1024 * 1024# Largest pixel count for pictures decoded at full size (PNG), about 4MB once decoded
+	STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')# Where profile pictures are kept: 'local' or 's3' (needs boto3)
+	S3_BUCKET = os.environ.get('S3_BUCKET')
+	S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')# Set for S3-compatible servers such as MinIO
+	S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')# Base URL pictures are served from, e.g. a CDN in front of the bucket
+	S3_OBJECT_ACL = os.environ.get('S3_OBJECT_ACL')# Canned ACL for uploaded pictures, e.g. 'public-read'; leave unset for buckets with ACLs disabled
+	VIEW_COUNTER_BACKEND = os.environ.get('VIEW_COUNTER_BACKEND', 'memory')# Buffer post views per worker ('memory') or per host ('file')
+	VIEW_FLUSH_INTERVAL = 30# Seconds between batched writes of buffered post views
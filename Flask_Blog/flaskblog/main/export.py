@@ -0,0 +1,267 @@
+import os
+import json
+import math
+import shutil
+import hashlib
+from urllib.parse import unquote
+from flask import url_for
+from flaskblog import db
+from flaskblog.models import Post, RelatedPost
+from flaskblog.main.utils import POSTS_PER_PAGE
+
+MANIFEST = '.export-manifest.json'
+
+
+def url_to_path(directory, url):
+	"""
+    Function to map a page URL to the file it is exported to.
+
+    Pages are written as <url>/index.html, so a static server configured to
+    try $uri/index.html (e.g. nginx try_files) serves them under the same
+    URLs the app uses. URLs with a file extension, like the feed, are written as is.
+    URLs with '.' or '..' segments, which would overwrite another page or
+    escape the export directory, are refused, as is any path that resolves
+    outside the directory.
+
+    Parameters:
+    -----------
+    directory : str
+        The export directory.
+    url : str
+        The page URL, as built by url_for.
+
+    Returns:
+    --------
+    path : str
+        The file the page is written to.
+
+    Raises:
+    -------
+    ValueError
+        If the URL has a '.' or '..' segment or the file would lie outside directory.
+    """
+	path = unquote(url).strip('/')
+	if any(segment in ('.', '..') for segment in path.split('/')):
+		raise ValueError(f'Refusing to export {url}: it has a relative path segment')
+	if not os.path.splitext(path)[1]:
+		path = os.path.join(path, 'index.html')
+	path = os.path.join(directory, path)
+	root = os.path.realpath(directory)
+	if os.path.commonpath([root, os.path.realpath(path)]) != root:
+		raise ValueError(f'Refusing to export {url} outside {directory}')
+	return path
+
+
+def is_exportable(username):
+	"""
+    Function to tell whether an author's pages can be exported under their username.
+
+    Usernames are validated on signup, but older accounts may still carry a
+    name the /user/<username> route cannot match ('/') or that is not a
+    directory name ('.', '..').
+
+    Parameters:
+    -----------
+    username : str
+        The author's username.
+
+    Returns:
+    --------
+    bool
+        True if the author pages can be written to <directory>/user/<username>/.
+    """
+	return username not in ('', '.', '..') and '/' not in username
+
+
+def post_fingerprint(post, related_ids):
+	"""
+    Function to summarize everything a post contributes to the rendered pages.
+
+    Parameters:
+    -----------
+    post : Post
+        The post, with its author and tags loaded.
+    related_ids : list of int
+        The ids of the post's precomputed related posts.
+
+    Returns:
+    --------
+    str
+        A digest that changes whenever the post's pages need re-rendering.
+    """
+	data = [post.title, post.content, post.date_posted.isoformat(), post.author.username,
+			post.author.image_file, [tag.name for tag in post.tags], related_ids]
+	return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+class SiteExport:
+	"""
+    Renders the public pages of the blog into a directory of static files.
+
+    The paginated home page, every post, every author page and the Atom feed
+    are rendered through the app itself, as an anonymous visitor would see
+    them. A manifest of post fingerprints is kept next to the files, so a
+    later export only re-renders the pages affected by posts created,
+    edited or deleted since, or whose author changed their name or picture.
+
+    Attributes:
+    -----------
+    app : Flask
+        The application whose pages are exported.
+    directory : str
+        The export directory.
+    base_url : str
+        The public URL of the site, used for absolute links in the feed.
+    """
+	def __init__(self, app, directory, base_url='http://localhost'):
+		self.app = app
+		self.directory = directory
+		self.base_url = base_url
+		self.client = app.test_client()
+		# Marks export requests so they are not counted as post views
+		self.client.environ_base['flaskblog.static_export'] = True
+		self.rendered = 0
+
+	def _load_manifest(self):
+		try:
+			with open(os.path.join(self.directory, MANIFEST)) as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return None
+
+	def _save_manifest(self, manifest):
+		with open(os.path.join(self.directory, MANIFEST), 'w') as f:
+			json.dump(manifest, f)
+
+	def _render(self, url):
+		response = self.client.get(url, base_url=self.base_url)
+		if response.status_code != 200:
+			raise RuntimeError(f'Exporting {url} failed with status {response.status_code}')
+		path = url_to_path(self.directory, url)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path + '.tmp', 'wb') as f:
+			f.write(response.get_data())
+		os.replace(path + '.tmp', path)
+		self.rendered += 1
+
+	def _remove(self, url):
+		path = url_to_path(self.directory, url)
+		if os.path.exists(path):
+			os.remove(path)
+			try:
+				os.removedirs(os.path.dirname(path))
+			except OSError:
+				pass
+
+	def _urls(self, home_pages, author_pages):
+		with self.app.test_request_context(base_url=self.base_url):
+			home = [(1, '/'), (1, url_for('main.home'))] + [(page, url_for('main.home', page=page))
+															for page in range(1, home_pages + 1)]
+			authors = {username: [url_for('users.user_posts', username=username)]
+								 + [url_for('users.user_posts', username=username, page=page) for page in range(1, pages + 1)]
+					   for username, pages in author_pages.items()}
+			return home, authors, url_for('main.feed')
+
+	def _post_url(self, post_id):
+		with self.app.test_request_context(base_url=self.base_url):
+			return url_for('posts.post', post_id=post_id)
+
+	def run(self, full=False):
+		"""
+        Export the site, re-rendering only what changed unless full is set.
+
+        Parameters:
+        -----------
+        full : bool
+            Re-render every page, ignoring the manifest of the previous export.
+
+        Returns:
+        --------
+        rendered : int
+            The number of pages written.
+        """
+		self.rendered = 0
+		os.makedirs(self.directory, exist_ok=True)
+		old = None if full else self._load_manifest()
+
+		posts = (Post.query.options(db.joinedload(Post.author), db.selectinload(Post.tags))
+				 .order_by(Post.date_posted.desc()).all())
+		related = {}
+		for link in RelatedPost.query.order_by(RelatedPost.post_id, RelatedPost.rank):
+			related.setdefault(link.post_id, []).append(link.related_id)
+
+		by_author = {}
+		for post in posts:
+			by_author.setdefault(post.author.username, []).append(post.id)
+		for username in [username for username in by_author if not is_exportable(username)]:
+			self.app.logger.warning('Skipping the pages of author %r, whose name cannot be exported', username)
+			del by_author[username]
+		home_pages = max(1, math.ceil(len(posts) / POSTS_PER_PAGE))
+		author_pages = {username: math.ceil(len(ids) / POSTS_PER_PAGE) for username, ids in by_author.items()}
+		manifest = {
+			'posts': {str(post.id): [post_fingerprint(post, related.get(post.id, [])), post.author.username]
+					  for post in posts},
+			'home_pages': home_pages,
+			'author_pages': author_pages,
+		}
+		home_urls, author_urls, feed_url = self._urls(home_pages, author_pages)
+
+		if old is None:
+			changed, added, removed = {post.id for post in posts}, set(), set()
+		else:
+			changed = {post.id for post in posts
+					   if old['posts'].get(str(post.id), [None])[0] != manifest['posts'][str(post.id)][0]}
+			added = {post_id for post_id in changed if str(post_id) not in old['posts']}
+			removed = {int(post_id) for post_id in old['posts'] if post_id not in manifest['posts']}
+
+		if old is not None and not changed and not removed:
+			return 0
+
+		# Authors of changed or removed posts, under their old and new names
+		authors = {manifest['posts'][str(post_id)][1] for post_id in changed}
+		if old is not None:
+			authors |= {entry[1] for post_id, entry in old['posts'].items()
+						if int(post_id) in changed | removed}
+
+		# A post's page lists its author's other posts and its related posts by title
+		touched = changed | removed
+		post_ids = set(changed)
+		for post in posts:
+			if post.author.username in authors or touched.intersection(related.get(post.id, [])):
+				post_ids.add(post.id)
+
+		for post_id in sorted(post_ids):
+			self._render(self._post_url(post_id))
+		for post_id in removed:
+			self._remove(self._post_url(post_id))
+
+		for username in authors:
+			if username in author_urls:
+				for url in author_urls[username]:
+					self._render(url)
+		if old is not None:
+			_, old_author_urls, _ = self._urls(0, old['author_pages'])
+			for username, urls in old_author_urls.items():
+				current = set(author_urls.get(username, []))
+				for url in urls:
+					if url not in current:
+						self._remove(url)
+
+		if old is None or added or removed:
+			# Posts were added or removed, shifting every page of the listing
+			home_to_render = [url for _, url in home_urls]
+		else:
+			positions = {post.id: index for index, post in enumerate(posts)}
+			pages = {positions[post_id] // POSTS_PER_PAGE + 1 for post_id in changed}
+			home_to_render = [url for page, url in home_urls if page in pages]
+		for url in home_to_render:
+			self._render(url)
+		if old is not None:
+			old_home_urls, _, _ = self._urls(old['home_pages'], {})
+			for _, url in old_home_urls[len(home_urls):]:
+				self._remove(url)
+
+		self._render(feed_url)
+		shutil.copytree(self.app.static_folder, os.path.join(self.directory, 'static'), dirs_exist_ok=True)
+		self._save_manifest(manifest)
+		return self.rendered
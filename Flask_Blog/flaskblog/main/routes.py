@@ -1,5 +1,9 @@
-from flask import render_template, request, Blueprint
+import click
+from datetime import datetime
+from flask import render_template, request, Blueprint, make_response, current_app
 from flaskblog.models import Post
+from flaskblog.main.utils import front_page, POSTS_PER_PAGE
+from flaskblog.main.export import SiteExport
 
 
 main =Blueprint('main', __name__)
@@ -27,12 +31,20 @@ Blueprint
 
 @main.route("/")
 @main.route("/home")
-def home():
+@main.route("/home/page/<int:page>")
+def home(page=1):
 	"""
     Route for displaying the home page.
 
+    Parameters:
+    -----------
+    page : int
+        The page number. Pagination links use the /home/page/<page> form so
+        that pages can be exported as static files; ?page= is still accepted.
+
     GET:
-    - Retrieves posts from the database, ordered by date posted in descending order.
+    - Serves the first page from the materialized front page, without querying the database.
+    - Retrieves other pages from the database, ordered by date posted in descending order.
     - Paginates the posts to display a limited number per page.
     - Renders the home.html template with paginated posts.
 
@@ -40,8 +52,11 @@ def home():
     --------
     Renders the home.html template with paginated posts.
     """
-	page = request.args.get('page',1, type=int)
-	posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=5)
+	page = request.args.get('page',page, type=int)
+	if page == 1:
+		posts = front_page.get()
+	else:
+		posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=POSTS_PER_PAGE)
 	return render_template('home.html', posts=posts)
 
 
@@ -57,4 +72,34 @@ def about():
     --------
     Renders the about.html template with title 'About'.
     """
-	return render_template('about.html', title='About')
\ No newline at end of file
+	return render_template('about.html', title='About')
+
+
+@main.route("/feed.xml")
+def feed():
+	"""
+    Route for the Atom feed of the latest posts.
+
+    Returns:
+    --------
+    The feed.xml template rendered with the 20 newest posts, served as Atom XML.
+    """
+	posts = Post.query.order_by(Post.date_posted.desc()).limit(20).all()
+	updated = posts[0].date_posted if posts else datetime.utcnow()
+	response = make_response(render_template('feed.xml', posts=posts, updated=updated))
+	response.mimetype = 'application/atom+xml'
+	return response
+
+
+@main.cli.command('export')
+@click.argument('directory')
+@click.option('--full', is_flag=True, help='Re-render every page instead of only the ones that changed.')
+@click.option('--base-url', default='http://localhost', show_default=True, help='Public URL of the site, used in the feed.')
+def export_command(directory, full, base_url):
+	"""
+    Command for exporting the public pages to DIRECTORY as static files.
+
+    Run after posts change, e.g. from cron: flask --app run main export public/
+    """
+	rendered = SiteExport(current_app, directory, base_url=base_url).run(full=full)
+	click.echo(f'Rendered {rendered} pages to {directory}.')
@@ -0,0 +1,264 @@
+import os
+import time
+import secrets
+import threading
+from contextlib import contextmanager
+from collections import namedtuple
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from flaskblog.models import Post
+
+try:
+	import fcntl
+except ImportError:  # Windows
+	fcntl = None
+
+POSTS_PER_PAGE = 5
+
+# Lightweight, detached copies of the rows the home page renders
+AuthorSummary = namedtuple('AuthorSummary', ['id', 'username', 'image_file'])
+PostSummary = namedtuple('PostSummary', ['id', 'title', 'content', 'date_posted', 'author'])
+
+
+def summarize_author(user):
+	"""
+    Build the author data shown next to a post on the home page.
+
+    Parameters:
+    -----------
+    user : User
+        The author of the post.
+
+    Returns:
+    --------
+    AuthorSummary
+        The author's id, username and profile picture.
+    """
+	return AuthorSummary(user.id, user.username, user.image_file)
+
+
+def summarize_post(post):
+	"""
+    Build the summary of a post shown on the home page.
+
+    Parameters:
+    -----------
+    post : Post
+        The post to summarize.
+
+    Returns:
+    --------
+    PostSummary
+        The post's fields together with its author's summary.
+    """
+	return PostSummary(post.id, post.title, post.content, post.date_posted, summarize_author(post.author))
+
+
+class FrontPagePagination(Pagination):
+	"""
+    Pagination over the materialized first page of the home timeline.
+
+    Behaves like the result of Post.query.paginate(page=1) in templates,
+    but takes its items and total from memory instead of the database.
+    """
+	def _query_items(self):
+		return list(self._query_args['items'])
+
+	def _query_count(self):
+		return self._query_args['total']
+
+
+class FrontPage:
+	"""
+    Materialized first page of the home timeline.
+
+    Holds the newest POSTS_PER_PAGE post summaries and the total post count,
+    so that the first page of the home route is served without any SQL.
+    The post and account routes keep it up to date incrementally.
+
+    Every change writes a new version stamp to a small file in the instance
+    folder. Other gunicorn workers compare their version with the stamp on
+    each read and rebuild from the database once when it has moved on. As a
+    safety net against lost updates, the page is also rebuilt when it is
+    older than max_age seconds.
+
+    Changes are applied under an exclusive flock on the stamp file, so two
+    workers never both apply a change on top of the same version. Where
+    flock is not available every change rebuilds the page instead.
+
+    Attributes:
+    -----------
+    per_page : int
+        Number of posts kept, matching the page size of the home route.
+    max_age : int
+        Maximum number of seconds a materialized page is served before being rebuilt.
+    version : str
+        The stamp the current entries were built against.
+    """
+	def __init__(self, per_page=POSTS_PER_PAGE, max_age=300):
+		self.per_page = per_page
+		self.max_age = max_age
+		self.version = None
+		self._entries = []
+		self._total = 0
+		self._built_at = 0
+		self._page = None
+		self._lock = threading.Lock()
+
+	def _stamp_path(self):
+		return os.path.join(current_app.instance_path, 'front_page.stamp')
+
+	def _read_stamp(self):
+		try:
+			with open(self._stamp_path()) as f:
+				return f.read() or None
+		except OSError:
+			return None
+
+	def _write_stamp(self):
+		stamp = secrets.token_hex(8)
+		with open(self._stamp_path(), 'w') as f:
+			f.write(stamp)
+		return stamp
+
+	@contextmanager
+	def _stamp_lock(self):
+		os.makedirs(current_app.instance_path, exist_ok=True)
+		fd = os.open(self._stamp_path(), os.O_RDWR | os.O_CREAT, 0o644)
+		try:
+			if fcntl is not None:
+				fcntl.flock(fd, fcntl.LOCK_EX)
+			yield
+		finally:
+			os.close(fd)
+
+	def _is_current(self, stamp):
+		return (self.version is not None and self.version == stamp
+				and time.monotonic() - self._built_at < self.max_age)
+
+	def _rebuild(self, stamp):
+		posts = Post.query.order_by(Post.date_posted.desc()).limit(self.per_page).all()
+		self._entries = [summarize_post(post) for post in posts]
+		self._total = Post.query.count()
+		self._built_at = time.monotonic()
+		self._publish(stamp)
+
+	def _publish(self, stamp):
+		self.version = stamp
+		self._page = FrontPagePagination(page=1, per_page=self.per_page,
+										 items=tuple(self._entries), total=self._total)
+
+	def get(self):
+		"""
+        Return the first page of the home timeline.
+
+        Returns:
+        --------
+        FrontPagePagination
+            The materialized page, rebuilt first if another worker changed it.
+        """
+		stamp = self._read_stamp()
+		if self._is_current(stamp):
+			return self._page
+		with self._lock:
+			if stamp is None:
+				with self._stamp_lock():
+					stamp = self._read_stamp() or self._write_stamp()
+			if not self._is_current(stamp):
+				self._rebuild(stamp)
+			return self._page
+
+	def _apply(self, change):
+		"""
+        Apply an incremental change and publish it under a new version stamp.
+
+        If this worker's copy is already out of date the change is not
+        applied on top of it; the page is rebuilt from the database instead.
+        The stamp is read, checked and replaced while holding the stamp lock,
+        so a change made by another worker in between cannot be lost.
+        """
+		with self._lock, self._stamp_lock():
+			current = fcntl is not None and self._is_current(self._read_stamp())
+			stamp = self._write_stamp()
+			if current and change():
+				self._publish(stamp)
+			else:
+				self._rebuild(stamp)
+
+	def post_created(self, post):
+		"""
+        Add a newly created post to the front of the page.
+
+        Parameters:
+        -----------
+        post : Post
+            The post that was just committed.
+        """
+		def change():
+			self._entries = [summarize_post(post)] + self._entries[:self.per_page - 1]
+			self._total += 1
+			return True
+		self._apply(change)
+
+	def post_updated(self, post):
+		"""
+        Refresh the summary of an edited post if it is on the page.
+
+        The change is only skipped when this worker's copy is current and
+        does not show the post; a stale or never built copy cannot tell, so
+        the stamp is bumped and the other workers rebuild.
+
+        Parameters:
+        -----------
+        post : Post
+            The post that was just updated.
+        """
+		if self._is_current(self._read_stamp()) and post.id not in {entry.id for entry in self._entries}:
+			return
+		def change():
+			self._entries = [summarize_post(post) if entry.id == post.id else entry
+							 for entry in self._entries]
+			return True
+		self._apply(change)
+
+	def post_deleted(self, post_id):
+		"""
+        Account for a deleted post.
+
+        Removing a post that is on the page pulls the next one up, which
+        needs the database, so that case is handled as a rebuild.
+
+        Parameters:
+        -----------
+        post_id : int
+            The id of the post that was just deleted.
+        """
+		def change():
+			self._total -= 1
+			return post_id not in {entry.id for entry in self._entries}
+		self._apply(change)
+
+	def author_updated(self, user):
+		"""
+        Refresh the author data of every post on the page written by user.
+
+        Like post_updated, the change is only skipped when this worker's
+        copy is current and already shows the author as they are now.
+
+        Parameters:
+        -----------
+        user : User
+            The author whose username or profile picture changed.
+        """
+		author = summarize_author(user)
+		if (self._is_current(self._read_stamp())
+				and all(entry.author == author for entry in self._entries if entry.author.id == user.id)):
+			return
+		def change():
+			self._entries = [entry._replace(author=author) if entry.author.id == user.id else entry
+							 for entry in self._entries]
+			return True
+		self._apply(change)
+
+
+front_page = FrontPage()
@@ -1,5 +1,8 @@
 from datetime import datetime# Importing datetime module for date and time operations
-from itsdangerous import TimedJSONWebSignatureSerializer as Serializer# Importing Serializer from itsdangerous module for token serialization
+import hashlib# Importing hashlib and hmac for fingerprinting password hashes
+import hmac
+import time# Importing time for token expiry timestamps
+from itsdangerous import URLSafeTimedSerializer, BadSignature# Importing the serializer from itsdangerous module for token serialization
 from flask import current_app# Importing current_app from Flask for accessing current application context
 from flaskblog import db, login_manager# Importing db and login_manager from flaskblog package
 from flask_login import UserMixin# Importing UserMixin from Flask-Login for user session management
@@ -9,6 +12,9 @@ def load_user(user_id):# Function to load a user from the database based on user
 	return User.query.get(int(user_id))# Returns the User object corresponding to user_id
 
 
+RESET_TOKEN_SALT = 'password-reset'# Namespaces reset tokens so other signed values cannot be used as one
+
+
 
 # Defining the User class which inherits from db.Model for database functionality
 # and UserMixin for Flask-Login integration
@@ -21,33 +27,75 @@ class User(db.Model, UserMixin):
 	posts = db.relationship('Post', backref='author', lazy=True)
 	#by Setting up a relationship with the 'posts' table using db.relationship,
     # allowing access to Post objects associated with a User through 'author'
+	__table_args__ = (
+		db.Index('ix_user_username_lower', db.func.lower(username), unique=True),
+		db.Index('ix_user_email_lower', db.func.lower(email), unique=True),
+	)
+	# Case-insensitive unique indexes: registration and account updates rely on
+	# these to reject duplicates in a single INSERT/UPDATE (see users.utils.add_duplicate_error)
 
 
 
 
-	def get_reset_token(self, expires_sec=1800):
+	def password_fingerprint(self):
+		"""
+        Fingerprint of the user's current password hash, bound into reset tokens.
 
-		s = Serializer(current_app.config['SECRET_KEY'], expires_sec)
-		return s.dumps({'user_id': self.id}).decode('utf-8')
+        Changing the password changes the fingerprint, so a reset token stops
+        working once it has been used or the password was changed otherwise.
 
-	@staticmethod
-	def verify_reset_token(token):
+        Returns:
+        str: A short keyed digest of the password hash.
+        """
+		key = current_app.config['SECRET_KEY'].encode('utf-8')
+		return hmac.new(key, self.password.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+	def get_reset_token(self, expires_sec=1800):
 		"""
         Generate a reset token for the user that expires in a specified number of seconds.
 
+        The signed payload carries the user id, the expiry time and the
+        password fingerprint.
+
         Parameters:
         expires_sec (int): Number of seconds before the token expires.
         Defaults to 1800 seconds (30 minutes).
 
         Returns:
-        str: The generated reset token as a UTF-8 encoded string.
+        str: The generated URL-safe reset token.
         """
-		s = Serializer(current_app.config['SECRET_KEY'])
+		s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=RESET_TOKEN_SALT)
+		return s.dumps({'user_id': self.id, 'exp': int(time.time()) + expires_sec,
+						'fp': self.password_fingerprint()})
+
+	@staticmethod
+	def verify_reset_token(token):
+		"""
+        Verify a reset token and return the user it was issued for.
+
+        Malformed, tampered and expired tokens are rejected from the signature
+        and the embedded expiry alone, before any database query. The user is
+        then loaded and the token is only accepted if it still matches their
+        current password, which makes it single-use.
+
+        Parameters:
+        token (str): The token received in the password reset email.
+
+        Returns:
+        User or None: The user if the token is valid, None otherwise.
+        """
+		s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=RESET_TOKEN_SALT)
 		try:
-			user_id = s.loads(token)['user_id']
-		except:
+			payload = s.loads(token)
+			user_id, exp, fingerprint = payload['user_id'], payload['exp'], payload['fp']
+		except (BadSignature, KeyError, TypeError):
+			return None
+		if not isinstance(exp, int) or exp < time.time():
 			return None
-		return User.query.get(user_id)
+		user = db.session.get(User, user_id)
+		if user is None or not hmac.compare_digest(str(fingerprint), user.password_fingerprint()):
+			return None
+		return user
 
 
 
@@ -71,6 +119,11 @@ class Post(db.Model):
 	date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 	content = db.Column(db.Text, nullable=False)
 	user_id =db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+	tag_links = db.relationship('PostTag', backref='post', lazy=True, cascade='all, delete-orphan')
+	tags = db.relationship('Tag', secondary='post_tag', lazy=True, viewonly=True, order_by='Tag.name')
+	bookmarks = db.relationship('Bookmark', backref='post', lazy=True, cascade='all, delete-orphan')
+	view_count = db.relationship('PostViewCount', uselist=False, lazy=True, cascade='all, delete-orphan')
+	__table_args__ = (db.Index('ix_post_user_date', 'user_id', 'date_posted'),)# Serves an author's posts, newest first
 
 	def __repr__(self):
 		"""
@@ -79,4 +132,91 @@ class Post(db.Model):
         Returns:
             str: String representation of the post.
         """
-		return f"Post('{self.title}','{self.date_posted}',)"
\ No newline at end of file
+		return f"Post('{self.title}','{self.date_posted}',)"
+
+
+class Tag(db.Model):
+	"""
+    Tag model represents a category that posts can be filed under.
+
+    Attributes:
+        id (int): The unique identifier for each tag, primary key.
+        name (str): The normalized tag name, unique, maximum length of 30 characters.
+        post_count (int): Cached number of posts carrying the tag, kept in step
+            by posts.utils.set_post_tags so listings never have to count rows.
+    """
+	id = db.Column(db.Integer, primary_key=True)
+	name = db.Column(db.String(30), unique=True, nullable=False)
+	post_count = db.Column(db.Integer, nullable=False, default=0)
+
+	def __repr__(self):
+		return f"Tag('{self.name}','{self.post_count}')"
+
+
+class PostTag(db.Model):
+	"""
+    Association between posts and tags.
+
+    The post's date_posted is copied onto each row so that the
+    (tag_id, date_posted, post_id) index covers a tag listing: filtering by
+    tag and ordering by date is a single index range scan, with no join
+    against the post table needed to sort.
+
+    Attributes:
+        post_id (int): The tagged post, part of the primary key.
+        tag_id (int): The tag, part of the primary key.
+        date_posted (datetime): Copy of Post.date_posted, which never changes.
+    """
+	__tablename__ = 'post_tag'
+	post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+	tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+	date_posted = db.Column(db.DateTime, nullable=False)
+	tag = db.relationship('Tag', lazy=True)
+	__table_args__ = (db.Index('ix_post_tag_tag_date', 'tag_id', 'date_posted', 'post_id'),)
+
+
+class Bookmark(db.Model):
+	"""
+    Bookmark model represents a post saved by a user for later.
+
+    Attributes:
+        user_id (int): The user who bookmarked the post, part of the primary key.
+        post_id (int): The bookmarked post, part of the primary key.
+        date_bookmarked (datetime): When the bookmark was made; the
+            (user_id, date_bookmarked, post_id) index covers a user's listing.
+    """
+	user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+	post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+	date_bookmarked = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+	__table_args__ = (db.Index('ix_bookmark_user_date', 'user_id', 'date_bookmarked', 'post_id'),)
+
+
+class RelatedPost(db.Model):
+	"""
+    Lookup table of precomputed related posts, filled offline by posts.related.rebuild_related.
+
+    Attributes:
+        post_id (int): The post the suggestions are for, part of the primary key.
+        rank (int): Position of the suggestion, 0 being the most similar, part of the primary key.
+        related_id (int): The suggested post.
+        score (float): Cosine similarity of the two posts' TF-IDF vectors.
+    """
+	__tablename__ = 'related_post'
+	post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+	rank = db.Column(db.Integer, primary_key=True)
+	related_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
+	score = db.Column(db.Float, nullable=False)
+	related = db.relationship('Post', foreign_keys=[related_id], lazy='joined')
+
+
+class PostViewCount(db.Model):
+	"""
+    Aggregated view count of a post, written in batches by posts.counters.ViewCounter.
+
+    Attributes:
+        post_id (int): The viewed post, primary key.
+        views (int): Number of views flushed so far; indexed for the most viewed listing.
+    """
+	__tablename__ = 'post_view_count'
+	post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+	views = db.Column(db.Integer, nullable=False, default=0, index=True)
@@ -0,0 +1,241 @@
+import os
+import atexit
+import threading
+from collections import Counter
+from flask import current_app
+from sqlalchemy import select, update, insert, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from flaskblog import db
+from flaskblog.models import Post, PostViewCount
+
+
+class MemoryBackend:
+	"""
+    Buffers view increments in this worker's memory.
+
+    Each gunicorn worker flushes its own buffer.
+    """
+	def __init__(self, app):
+		self.counts = Counter()
+		self.lock = threading.Lock()
+
+	def add(self, post_id):
+		with self.lock:
+			self.counts[post_id] += 1
+
+	def drain(self):
+		with self.lock:
+			counts, self.counts = self.counts, Counter()
+		return counts
+
+	def restore(self, counts):
+		with self.lock:
+			self.counts.update(counts)
+
+	def pending(self, post_id):
+		return self.counts[post_id]
+
+
+class FileBackend:
+	"""
+    Buffers view increments in a spool file shared by all workers on the host.
+
+    Workers append one line per view under a shared lock; whichever worker
+    flushes first takes an exclusive lock just long enough to read and
+    truncate the file, so the host writes one combined batch per interval.
+    Needs a POSIX system, like gunicorn itself.
+    """
+	def __init__(self, app):
+		import fcntl
+		self.fcntl = fcntl
+		os.makedirs(app.instance_path, exist_ok=True)
+		self.path = os.path.join(app.instance_path, 'post_views.spool')
+
+	def _append(self, data):
+		fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+		try:
+			self.fcntl.flock(fd, self.fcntl.LOCK_SH)
+			os.write(fd, data)
+		finally:
+			os.close(fd)
+
+	def add(self, post_id):
+		self._append(b'%d\n' % post_id)
+
+	def drain(self):
+		try:
+			f = open(self.path, 'r+b')
+		except FileNotFoundError:
+			return Counter()
+		with f:
+			self.fcntl.flock(f, self.fcntl.LOCK_EX)
+			data = f.read()
+			f.truncate(0)
+		return Counter(int(line) for line in data.split())
+
+	def restore(self, counts):
+		self._append(b''.join(b'%d\n' % post_id for post_id in counts.elements()))
+
+	def pending(self, post_id):
+		return 0
+
+
+BACKENDS = {'memory': MemoryBackend, 'file': FileBackend}
+
+
+def write_counts(counts):
+	"""
+    Function to add a batch of view increments to the post_view_count table in one transaction.
+
+    Rows that already exist are bumped with a single executemany UPDATE;
+    rows are created for posts that had no views yet. Increments for posts
+    deleted in the meantime are dropped.
+
+    Parameters:
+    -----------
+    counts : Counter
+        Number of new views per post id.
+    """
+	table = PostViewCount.__table__
+	with db.engine.begin() as connection:
+		existing = set(connection.scalars(select(table.c.post_id).where(table.c.post_id.in_(counts))))
+		if existing:
+			connection.execute(
+				update(table).where(table.c.post_id == bindparam('pid')).values(views=table.c.views + bindparam('n')),
+				[{'pid': post_id, 'n': counts[post_id]} for post_id in existing])
+		missing = [post_id for post_id in counts if post_id not in existing]
+		if missing:
+			valid = connection.scalars(select(Post.__table__.c.id).where(Post.__table__.c.id.in_(missing))).all()
+			if valid:
+				connection.execute(insert(table), [{'post_id': post_id, 'views': counts[post_id]} for post_id in valid])
+
+
+class ViewBuffer:
+	"""
+    The view counting state of one app: its backend and the thread flushing it.
+
+    The thread writes the buffered views every VIEW_FLUSH_INTERVAL seconds,
+    whether or not more views come in, and once more when the worker exits.
+    Views buffered since the last flush are lost only if the worker is
+    killed without a chance to exit (e.g. SIGKILL), which bounds the loss
+    to one interval.
+    """
+	def __init__(self, app):
+		self.app = app
+		self.backend = BACKENDS[app.config.get('VIEW_COUNTER_BACKEND', 'memory')](app)
+		self.interval = app.config.get('VIEW_FLUSH_INTERVAL', 30)
+		self.stopped = threading.Event()
+		self.thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+		self.thread.start()
+		atexit.register(self.close)
+
+	def _run(self):
+		while not self.stopped.wait(self.interval):
+			self.flush()
+
+	def flush(self):
+		"""
+        Write the buffered views to the database, putting them back if that fails.
+
+        Returns:
+        --------
+        int
+            The number of views written.
+        """
+		counts = self.backend.drain()
+		if not counts:
+			return 0
+		try:
+			with self.app.app_context():
+				write_counts(counts)
+		except SQLAlchemyError as e:
+			self.backend.restore(counts)
+			self.app.logger.error('Failed to flush post views: %s', e)
+			return 0
+		return sum(counts.values())
+
+	def close(self):
+		"""
+        Stop the flushing thread and write what is still buffered.
+        """
+		if not self.stopped.is_set():
+			self.stopped.set()
+			self.flush()
+
+
+class ViewCounter:
+	"""
+    Counts post views without turning every read into a database write.
+
+    Views are buffered by the backend chosen with VIEW_COUNTER_BACKEND
+    ('memory' per worker, or 'file' shared by the workers of a host) and
+    written in batches by a background thread every VIEW_FLUSH_INTERVAL
+    seconds, plus once when the worker exits. Each app gets its own
+    ViewBuffer in app.extensions, created on its first recorded view so
+    that no thread is started before gunicorn forks its workers.
+    """
+	def __init__(self):
+		self._lock = threading.Lock()
+
+	def _buffer(self, create=False):
+		buffer = current_app.extensions.get('view_counter')
+		if buffer is None and create:
+			with self._lock:
+				buffer = current_app.extensions.get('view_counter')
+				if buffer is None:
+					buffer = current_app.extensions['view_counter'] = ViewBuffer(current_app._get_current_object())
+		return buffer
+
+	def record(self, post_id):
+		"""
+        Count one view of a post.
+
+        Parameters:
+        -----------
+        post_id : int
+            The viewed post.
+        """
+		self._buffer(create=True).backend.add(post_id)
+
+	def flush(self):
+		"""
+        Write the current app's buffered views to the database now.
+
+        If the write fails the views are put back in the buffer for the next flush.
+
+        Returns:
+        --------
+        int
+            The number of views written.
+        """
+		buffer = self._buffer()
+		return buffer.flush() if buffer else 0
+
+	def close(self):
+		"""
+        Stop the current app's flushing thread after writing its buffered views.
+        """
+		buffer = current_app.extensions.pop('view_counter', None)
+		if buffer is not None:
+			buffer.close()
+
+	def views(self, post):
+		"""
+        Return the number of views of a post, including this worker's unflushed ones.
+
+        Parameters:
+        -----------
+        post : Post
+            The post to count views for.
+
+        Returns:
+        --------
+        int
+            The stored count plus the views still buffered in memory.
+        """
+		stored = post.view_count.views if post.view_count else 0
+		buffer = self._buffer()
+		return stored + (buffer.backend.pending(post.id) if buffer else 0)
+
+
+view_counter = ViewCounter()
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField, TextAreaField
-from wtforms.validators import DataRequired
+from wtforms.validators import DataRequired, Length, Optional, ValidationError
 
 class PostForm(FlaskForm):
 	"""
@@ -18,9 +18,39 @@ class PostForm(FlaskForm):
         Validators:
             - DataRequired: Ensures the field is not submitted empty.
 
+    tags : StringField
+        Field for entering comma separated tags for the post.
+        Validators:
+            - Optional: The post may carry no tags.
+            - Length: Keeps the list to a reasonable size.
+
     submit : SubmitField
         Button for submitting the post form.
     """
 	title = StringField('Title', validators=[DataRequired()])
 	content = TextAreaField('Content', validators=[DataRequired()])
+	tags = StringField('Tags (comma separated)', validators=[Optional(), Length(max=200)])
 	submit = SubmitField('Post')
+
+	def validate_tags(self, tags):
+		"""
+		Custom validator for the tags field.
+
+		Checks that every comma separated tag fits in the tag name column and
+		contains no '/', which the /tag/<name> URLs cannot carry.
+
+		Parameters:
+		-----------
+		tags : StringField
+			The field representing the tags to be validated.
+
+		Raises:
+		-------
+		ValidationError
+			If a tag is longer than 30 characters or contains a '/'.
+		"""
+		for name in tags.data.split(','):
+			if len(name.strip()) > 30:
+				raise ValidationError('Tags can be at most 30 characters long')
+			if '/' in name:
+				raise ValidationError("Tags cannot contain '/'")
@@ -0,0 +1,149 @@
+import re
+import math
+from array import array
+from collections import Counter
+from flaskblog import db
+from flaskblog.models import Post, RelatedPost
+
+TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+
+
+def tokenize(text):
+	"""
+    Function to split post text into the terms used for similarity.
+
+    Terms are lowercased words of at least three characters plus the
+    bigrams (two word shingles) they form, which favours posts sharing phrases.
+
+    Parameters:
+    -----------
+    text : str
+        The text of a post.
+
+    Returns:
+    --------
+    terms : list of str
+        The post's terms, with repeats.
+    """
+	words = TOKEN_RE.findall(text.lower())
+	return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def tfidf_matrix(documents, max_terms=20000):
+	"""
+    Function to build the L2-normalized TF-IDF matrix of a list of documents.
+
+    The matrix is sparse, so memory grows with the number of distinct terms
+    in each post rather than with len(documents) * max_terms; the weights and
+    norms are applied in place to its nonzero values.
+
+    Parameters:
+    -----------
+    documents : list of str
+        The texts to vectorize.
+    max_terms : int
+        Only the terms found in the most documents are kept, bounding the vocabulary.
+
+    Returns:
+    --------
+    matrix : scipy.sparse.csr_matrix
+        A (len(documents), terms) float32 matrix with unit-length rows.
+    """
+	import numpy as np
+	from scipy import sparse
+
+	counts = [Counter(tokenize(document)) for document in documents]
+	document_frequency = Counter(term for count in counts for term in count)
+	# Terms seen in a single post cannot link it to another one
+	terms = [term for term, df in document_frequency.most_common(max_terms) if df > 1]
+	index = {term: i for i, term in enumerate(terms)}
+
+	indptr, indices, data = array('q', [0]), array('i'), array('f')
+	for count in counts:
+		for term, n in count.items():
+			column = index.get(term)
+			if column is not None:
+				indices.append(column)
+				data.append(1 + math.log(n))
+		indptr.append(len(indices))
+	matrix = sparse.csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32),
+								np.array(indptr, dtype=np.int64)), shape=(len(documents), len(terms)))
+
+	df = np.array([document_frequency[term] for term in terms], dtype=np.float32)
+	idf = np.log((1 + len(documents)) / (1 + df)) + 1
+	matrix.data *= idf[matrix.indices]
+	rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+	norms = np.sqrt(np.bincount(rows, weights=matrix.data ** 2, minlength=matrix.shape[0]))
+	norms[norms == 0] = 1
+	matrix.data /= norms[rows].astype(np.float32)
+	return matrix
+
+
+def most_similar(matrix, top_n=3, block_size=512):
+	"""
+    Function to find the most similar rows of a normalized matrix by cosine similarity.
+
+    Similarities are computed one block of rows at a time, so memory grows
+    with block_size * rows rather than rows squared.
+
+    Parameters:
+    -----------
+    matrix : scipy.sparse.csr_matrix
+        Unit-length row vectors, as returned by tfidf_matrix.
+    top_n : int
+        Number of neighbours to keep per row.
+    block_size : int
+        Number of rows compared against the whole matrix at once.
+
+    Returns:
+    --------
+    neighbours : list of list of (int, float)
+        For each row, up to top_n (row index, score) pairs, best first, with a positive score.
+    """
+	import numpy as np
+
+	rows = matrix.shape[0]
+	k = min(top_n, rows - 1)
+	neighbours = []
+	if k <= 0:
+		return [[] for _ in range(rows)]
+	transposed = matrix.T.tocsr()
+	for start in range(0, rows, block_size):
+		scores = (matrix[start:start + block_size] @ transposed).toarray()
+		block = np.arange(scores.shape[0])
+		scores[block, block + start] = -1  # a post is not related to itself
+		best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+		best_scores = scores[block[:, None], best]
+		order = np.argsort(-best_scores, axis=1)
+		for indices, values in zip(np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)):
+			neighbours.append([(int(i), float(v)) for i, v in zip(indices, values) if v > 0])
+	return neighbours
+
+
+def rebuild_related(top_n=3):
+	"""
+    Function to recompute the related posts lookup table for every post.
+
+    Meant to run offline (see the 'flask posts related' command); the post
+    page only reads the stored results.
+
+    Parameters:
+    -----------
+    top_n : int
+        Number of related posts stored per post.
+
+    Returns:
+    --------
+    count : int
+        Number of related post rows written.
+    """
+	rows = db.session.query(Post.id, Post.title, Post.content).order_by(Post.id).all()
+	ids = [row.id for row in rows]
+	matrix = tfidf_matrix([f'{row.title} {row.content}' for row in rows])
+	links = [RelatedPost(post_id=ids[i], rank=rank, related_id=ids[j], score=score)
+			 for i, similar in enumerate(most_similar(matrix, top_n=top_n))
+			 for rank, (j, score) in enumerate(similar)]
+	RelatedPost.query.delete()
+	db.session.add_all(links)
+	db.session.commit()
+	return len(links)
@@ -1,9 +1,13 @@
+import click
 from flask import (render_template, url_for, flash,
                    redirect, request, abort, Blueprint)
 from flask_login import current_user, login_required
 from flaskblog import db
-from flaskblog.models import Post
+from flaskblog.models import Post, Tag, Bookmark, RelatedPost, PostViewCount
 from flaskblog.posts.forms import PostForm
+from flaskblog.main.utils import front_page
+from flaskblog.posts.utils import parse_tags, set_post_tags, tag_posts, bookmarked_posts
+from flaskblog.posts.counters import view_counter
 
 posts =Blueprint('posts', __name__)
 """
@@ -50,7 +54,9 @@ def new_post():
 	if form.validate_on_submit():
 		post=Post(title=form.title.data, content=form.content.data, author=current_user)
 		db.session.add(post)
+		set_post_tags(post, parse_tags(form.tags.data))
 		db.session.commit()
+		front_page.post_created(post)
 		flash('Your Post has been Created Successfully.', 'success')
 		return redirect(url_for('main.home'))
 	return render_template('create_post.html', title= 'New Post', form=form, legend='New Post')
@@ -68,12 +74,28 @@ def post(post_id):
     post_id : int
         The unique identifier of the post to be displayed.
 
+    GET:
+    - Retrieves the post and the author's latest other posts.
+    - Counts and shows the views from the buffered view counter, except while exporting static pages.
+    - Reads the related posts precomputed by the 'flask posts related' command.
+
     Returns:
     --------
     Renders the post.html template with the specified post's title and content.
     """
 	post = Post.query.get_or_404(post_id)
-	return render_template('post.html', title=post.title, post=post)
+	# Static exports are not views, and a count frozen into the exported page would only go stale
+	static_export = request.environ.get('flaskblog.static_export', False)
+	if not static_export:
+		view_counter.record(post.id)
+	bookmarked = (current_user.is_authenticated
+				  and db.session.get(Bookmark, (current_user.id, post.id)) is not None)
+	author_posts = (Post.query.filter(Post.user_id == post.user_id, Post.id != post.id)
+					.order_by(Post.date_posted.desc()).limit(3).all())
+	related = [link.related for link in RelatedPost.query.filter_by(post_id=post.id).order_by(RelatedPost.rank)]
+	return render_template('post.html', title=post.title, post=post, bookmarked=bookmarked,
+						   author_posts=author_posts, related=related,
+						   views=None if static_export else view_counter.views(post))
 
 
 @posts.route("/post/<int:post_id>/update", methods=['GET', 'POST'])
@@ -111,12 +133,15 @@ def update_post(post_id):
 	if form.validate_on_submit():
 		post.title= form.title.data
 		post.content= form.content.data
+		set_post_tags(post, parse_tags(form.tags.data))
 		db.session.commit()
+		front_page.post_updated(post)
 		flash('You have successfully updated your post', 'success')
 		return redirect(url_for('posts.post', post_id=post.id))
 	elif request.method == 'GET':
 		form.title.data = post.title
 		form.content.data = post.content
+		form.tags.data = ', '.join(tag.name for tag in post.tags)
 	return render_template('create_post.html', title='Update Post', form=form, legend='Update Post')
 
 
@@ -147,7 +172,128 @@ def delete_post(post_id):
 	# Check if the current user is the author of the post
 	if post.author != current_user:
 		abort(403)
+	set_post_tags(post, [])
+	RelatedPost.query.filter((RelatedPost.post_id == post.id) | (RelatedPost.related_id == post.id)).delete()
 	db.session.delete(post)
 	db.session.commit()
+	front_page.post_deleted(post_id)
 	flash('You have successfully deleted your post!', 'success')
 	return redirect(url_for('main.home'))
+
+
+
+
+@posts.route("/post/<int:post_id>/bookmark", methods=['POST'])
+@login_required
+def bookmark_post(post_id):
+	"""
+    Route for bookmarking a post, or removing the bookmark if it is already set.
+
+    Parameters:
+    -----------
+    post_id : int
+        The unique identifier of the post to be bookmarked.
+
+    Returns:
+    --------
+    Redirects to the post's page.
+    """
+	post = Post.query.get_or_404(post_id)
+	bookmark = db.session.get(Bookmark, (current_user.id, post.id))
+	if bookmark:
+		db.session.delete(bookmark)
+		flash('Bookmark removed.', 'info')
+	else:
+		db.session.add(Bookmark(user_id=current_user.id, post_id=post.id))
+		flash('Post bookmarked.', 'success')
+	db.session.commit()
+	return redirect(url_for('posts.post', post_id=post.id))
+
+
+@posts.route("/bookmarks")
+@login_required
+def bookmarks():
+	"""
+    Route for displaying the current user's bookmarked posts.
+
+    GET:
+    - Reads the 'before' cursor from the query string.
+    - Retrieves one page of bookmarked posts, most recently bookmarked first, using keyset pagination.
+
+    Returns:
+    --------
+    Renders the post_list.html template with the page of posts and a link to the next page.
+    """
+	before = request.args.get('before')
+	page_posts, next_cursor = bookmarked_posts(current_user, before=before)
+	next_url = url_for('posts.bookmarks', before=next_cursor) if next_cursor else None
+	return render_template('post_list.html', title='Bookmarked Posts', heading='Bookmarked Posts',
+						   posts=page_posts, next_url=next_url)
+
+
+@posts.route("/popular")
+def popular():
+	"""
+    Route for displaying the most viewed posts.
+
+    Returns:
+    --------
+    Renders the post_list.html template with the ten most viewed posts, read off the index on the aggregated view counts.
+    """
+	popular_posts = (Post.query.join(PostViewCount, PostViewCount.post_id == Post.id)
+					 .order_by(PostViewCount.views.desc()).limit(10).all())
+	return render_template('post_list.html', title='Most Viewed', heading='Most Viewed Posts',
+						   posts=popular_posts, next_url=None)
+
+
+@posts.route("/tags")
+def tags():
+	"""
+    Route for displaying every category together with its number of posts.
+
+    Returns:
+    --------
+    Renders the tags.html template with the tags, most used first.
+    """
+	all_tags = Tag.query.filter(Tag.post_count > 0).order_by(Tag.post_count.desc(), Tag.name).all()
+	return render_template('tags.html', title='Categories', tags=all_tags)
+
+
+@posts.route("/tag/<string:name>")
+def tag_posts_list(name):
+	"""
+    Route for displaying the posts filed under a tag.
+
+    Parameters:
+    -----------
+    name : str
+        The name of the tag whose posts are to be displayed.
+
+    GET:
+    - Reads the 'before' cursor from the query string.
+    - Retrieves one page of the tag's posts, newest first, using keyset pagination.
+
+    Returns:
+    --------
+    Renders the post_list.html template with the page of posts and a link to the next page.
+    """
+	tag = Tag.query.filter_by(name=name.lower()).first_or_404()
+	before = request.args.get('before')
+	page_posts, next_cursor = tag_posts(tag, before=before)
+	next_url = url_for('posts.tag_posts_list', name=tag.name, before=next_cursor) if next_cursor else None
+	return render_template('post_list.html', title=tag.name, heading=f'Posts tagged "{tag.name}" ({tag.post_count})',
+						   posts=page_posts, next_url=next_url)
+
+
+@posts.cli.command('related')
+@click.option('--top', default=3, show_default=True, help='Number of related posts stored per post.')
+def related_command(top):
+	"""
+    Command for recomputing the related posts shown on each post's page.
+
+    Run periodically, e.g. from cron: flask --app run posts related
+    """
+	# NumPy/SciPy are only needed here, so they are not loaded by the web workers
+	from flaskblog.posts.related import rebuild_related
+	count = rebuild_related(top_n=top)
+	click.echo(f'Stored {count} related post links.')
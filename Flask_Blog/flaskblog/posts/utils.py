@@ -0,0 +1,188 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from flaskblog import db
+from flaskblog.models import Post, Tag, PostTag, Bookmark
+from flaskblog.main.utils import POSTS_PER_PAGE
+
+
+def parse_tags(text):
+	"""
+    Function to turn the comma separated tags typed in a form into tag names.
+
+    Parameters:
+    -----------
+    text : str
+        The raw value of the tags field.
+
+    Returns:
+    --------
+    names : list of str
+        Lowercased, de-duplicated tag names in the order they were typed.
+    """
+	names = []
+	for name in (text or '').split(','):
+		name = name.strip().lower()
+		if name and name not in names:
+			names.append(name)
+	return names
+
+
+def set_post_tags(post, names):
+	"""
+    Function to replace the tags of a post, keeping the cached tag counts in step.
+
+    Tags that do not exist yet are created inside a savepoint; if another
+    request creates the same tag first, the insert fails on the unique name
+    and the existing tag is used instead. The caller commits the session.
+
+    Parameters:
+    -----------
+    post : Post
+        The post to tag, already added to the session.
+    names : list of str
+        The tag names the post should carry afterwards.
+    """
+	db.session.flush()
+	current = {link.tag.name: link for link in post.tag_links}
+	for name, link in current.items():
+		if name not in names:
+			link.tag.post_count = Tag.post_count - 1
+			post.tag_links.remove(link)
+	for name in names:
+		if name in current:
+			continue
+		tag = Tag.query.filter_by(name=name).first()
+		if tag is None:
+			try:
+				with db.session.begin_nested():
+					tag = Tag(name=name, post_count=0)
+					db.session.add(tag)
+			except IntegrityError:
+				tag = Tag.query.filter_by(name=name).one()
+		tag.post_count = Tag.post_count + 1
+		post.tag_links.append(PostTag(tag=tag, date_posted=post.date_posted))
+
+
+def encode_cursor(date, post_id):
+	"""
+    Function to build the keyset cursor of a page from the sort key of its last post.
+
+    Parameters:
+    -----------
+    date : datetime
+        The date the last post is sorted by (posted or bookmarked).
+    post_id : int
+        The id of the last post, breaking ties between equal dates.
+
+    Returns:
+    --------
+    str
+        The cursor, as '<ISO date>_<post id>'.
+    """
+	return f'{date.isoformat()}_{post_id}'
+
+
+def decode_cursor(cursor):
+	"""
+    Function to read the sort key back out of a keyset cursor.
+
+    Parameters:
+    -----------
+    cursor : str or None
+        A cursor built by encode_cursor, as received in the query string.
+
+    Returns:
+    --------
+    (date, post_id) : tuple or None
+        The sort key to continue below, or None for a missing or malformed cursor.
+    """
+	try:
+		date, post_id = cursor.rsplit('_', 1)
+		return datetime.fromisoformat(date), int(post_id)
+	except (AttributeError, ValueError):
+		return None
+
+
+def keyset_page(query, date_column, id_column, before, per_page):
+	"""
+    Function to fetch one page of posts, newest first, continuing below a keyset cursor.
+
+    The cursor carries the sort key itself rather than the id of a row, so
+    the next page stays where it is even if the post the previous page ended
+    on has since been untagged, unbookmarked or deleted.
+
+    Parameters:
+    -----------
+    query : Query
+        The posts to page through, joined with the table holding date_column.
+    date_column, id_column : Column
+        The indexed columns the posts are sorted by, newest first.
+    before : str or None
+        The cursor of the page, or None for the first page.
+    per_page : int
+        Maximum number of posts on the page.
+
+    Returns:
+    --------
+    (posts, next_cursor) : tuple
+        The posts on the page and the cursor of the next page, or None if this is the last one.
+    """
+	cursor = decode_cursor(before)
+	if cursor is not None:
+		query = query.filter(db.tuple_(date_column, id_column) < cursor)
+	rows = (query.add_columns(date_column)
+			.order_by(date_column.desc(), id_column.desc()).limit(per_page + 1).all())
+	posts = [post for post, _ in rows[:per_page]]
+	if len(rows) <= per_page:
+		return posts, None
+	return posts, encode_cursor(rows[per_page - 1][1], posts[-1].id)
+
+
+def tag_posts(tag, before=None, per_page=POSTS_PER_PAGE):
+	"""
+    Function to fetch one page of a tag's posts, newest first, using keyset pagination.
+
+    The page is read off the (tag_id, date_posted, post_id) index starting
+    just below the cursor, so the cost does not grow with how deep the reader
+    pages, unlike OFFSET.
+
+    Parameters:
+    -----------
+    tag : Tag
+        The tag to list posts for.
+    before : str or None
+        The cursor returned for the previous page, or None for the first page.
+    per_page : int
+        Maximum number of posts on the page.
+
+    Returns:
+    --------
+    (posts, next_cursor) : tuple
+        The posts on the page and the cursor of the next page, or None if this is the last one.
+    """
+	query = Post.query.join(PostTag, PostTag.post_id == Post.id).filter(PostTag.tag_id == tag.id)
+	return keyset_page(query, PostTag.date_posted, PostTag.post_id, before, per_page)
+
+
+def bookmarked_posts(user, before=None, per_page=POSTS_PER_PAGE):
+	"""
+    Function to fetch one page of a user's bookmarked posts, most recently bookmarked first.
+
+    Works like tag_posts, reading off the (user_id, date_bookmarked, post_id) index.
+
+    Parameters:
+    -----------
+    user : User
+        The user whose bookmarks are listed.
+    before : str or None
+        The cursor returned for the previous page, or None for the first page.
+    per_page : int
+        Maximum number of posts on the page.
+
+    Returns:
+    --------
+    (posts, next_cursor) : tuple
+        The posts on the page and the cursor of the next page, or None if this is the last one.
+    """
+	query = Post.query.join(Bookmark, Bookmark.post_id == Post.id).filter(Bookmark.user_id == user.id)
+	return keyset_page(query, Bookmark.date_bookmarked, Bookmark.post_id, before, per_page)
@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import url_for, current_app
+
+# Avatar every new account starts with, always served from the app's own static folder
+DEFAULT_PICTURE = 'default.jpg'
+
+
+class StorageError(Exception):
+	"""
+    Raised by a storage backend when a picture could not be stored.
+    """
+
+
+class LocalStorage:
+	"""
+    Storage backend keeping profile pictures in the app's static/assets folder.
+
+    Only suitable for a single host, or several hosts sharing that folder.
+    """
+	def __init__(self, app):
+		self.directory = os.path.join(app.root_path, 'static/assets')
+
+	def save(self, filename, data, content_type):
+		"""
+        Write a picture to the assets folder, raising StorageError if that fails.
+
+        Parameters:
+        -----------
+        filename : str
+            The name to store the picture under.
+        data : bytes
+            The encoded picture.
+        content_type : str
+            The picture's MIME type, unused on disk.
+        """
+		try:
+			with open(os.path.join(self.directory, filename), 'wb') as f:
+				f.write(data)
+		except OSError as e:
+			raise StorageError(f'Could not write {filename}: {e}') from e
+
+	def delete(self, filename):
+		"""
+        Remove a picture from the assets folder, if it is there.
+
+        Parameters:
+        -----------
+        filename : str
+            The name the picture was stored under.
+        """
+		try:
+			os.remove(os.path.join(self.directory, filename))
+		except FileNotFoundError:
+			pass
+
+	def url(self, filename):
+		"""
+        Return the URL a stored picture is served from.
+
+        Parameters:
+        -----------
+        filename : str
+            The name the picture was stored under.
+        """
+		return url_for('static', filename='assets/' + filename)
+
+
+class S3Storage:
+	"""
+    Storage backend keeping profile pictures in an S3-compatible bucket.
+
+    Works against AWS S3 or any server speaking its API, such as MinIO, by
+    setting S3_ENDPOINT_URL. Credentials are picked up by boto3 from the
+    usual AWS_* environment variables. Uploads are synchronous, so a picture
+    is only referenced from the database once it is in the bucket; the 125px
+    thumbnails keep that wait short. Deletes of pictures that are no longer
+    referenced run on a small thread pool, as nothing waits on them.
+
+    Objects are written without an ACL unless S3_OBJECT_ACL is set (e.g.
+    'public-read'), since buckets with ACLs disabled reject any ACL and are
+    made public with a bucket policy instead.
+    """
+	def __init__(self, app):
+		try:
+			import boto3
+			from botocore.exceptions import BotoCoreError, ClientError
+		except ImportError:
+			raise RuntimeError("STORAGE_BACKEND 's3' requires the boto3 package to be installed")
+		self.errors = (BotoCoreError, ClientError)
+		self.bucket = app.config['S3_BUCKET']
+		endpoint_url = app.config.get('S3_ENDPOINT_URL')
+		self.client = boto3.client('s3', endpoint_url=endpoint_url)
+		self.public_url = (app.config.get('S3_PUBLIC_URL')
+						   or f"{endpoint_url or 'https://s3.amazonaws.com'}/{self.bucket}").rstrip('/')
+		self.acl = app.config.get('S3_OBJECT_ACL')
+		self.logger = app.logger
+		self.executor = ThreadPoolExecutor(max_workers=app.config.get('S3_DELETE_WORKERS', 2))
+
+	def _report(self, filename, future):
+		if future.exception() is not None:
+			self.logger.error('Failed to delete %s from S3: %s', filename, future.exception())
+
+	def save(self, filename, data, content_type):
+		"""
+        Upload a picture to the bucket, raising StorageError if the upload fails.
+
+        Parameters:
+        -----------
+        filename : str
+            The key to store the picture under.
+        data : bytes
+            The encoded picture.
+        content_type : str
+            The picture's MIME type, sent as the object's Content-Type.
+        """
+		extra = {'ACL': self.acl} if self.acl else {}
+		try:
+			self.client.put_object(Bucket=self.bucket, Key=filename, Body=data,
+								   ContentType=content_type, **extra)
+		except self.errors as e:
+			raise StorageError(f'Could not upload {filename} to S3: {e}') from e
+
+	def delete(self, filename):
+		"""
+        Queue a picture for removal from the bucket and return immediately.
+
+        Parameters:
+        -----------
+        filename : str
+            The key the picture was stored under.
+        """
+		future = self.executor.submit(self.client.delete_object, Bucket=self.bucket, Key=filename)
+		future.add_done_callback(lambda f: self._report(filename, f))
+
+	def url(self, filename):
+		"""
+        Return the public URL of a stored picture.
+
+        Parameters:
+        -----------
+        filename : str
+            The key the picture was stored under.
+        """
+		return f'{self.public_url}/{filename}'
+
+
+BACKENDS = {'local': LocalStorage, 's3': S3Storage}
+
+
+class Storage:
+	"""
+    Extension giving the app a pluggable place to keep profile pictures.
+
+    The backend is chosen by the STORAGE_BACKEND setting ('local' or 's3').
+    Templates build picture URLs with the avatar_url global, so switching the
+    backend needs no template changes and app nodes stay stateless with 's3'.
+    """
+	def init_app(self, app):
+		"""
+        Create the configured backend and register the avatar_url template global.
+
+        Parameters:
+        -----------
+        app : Flask
+            The application to set up storage for.
+        """
+		name = app.config.get('STORAGE_BACKEND', 'local')
+		if name not in BACKENDS:
+			raise RuntimeError(f'Unknown STORAGE_BACKEND {name!r}, expected one of {sorted(BACKENDS)}')
+		app.extensions['storage'] = BACKENDS[name](app)
+		app.add_template_global(self.url, 'avatar_url')
+
+	@property
+	def backend(self):
+		return current_app.extensions['storage']
+
+	def save(self, filename, data, content_type):
+		"""
+        Store a picture with the configured backend.
+
+        Parameters:
+        -----------
+        filename : str
+            The name to store the picture under.
+        data : bytes
+            The encoded picture.
+        content_type : str
+            The picture's MIME type.
+
+        Raises:
+        -------
+        StorageError
+            If the backend could not store the picture.
+        """
+		self.backend.save(filename, data, content_type)
+
+	def delete(self, filename):
+		"""
+        Remove a stored picture with the configured backend.
+
+        The shared default picture is never removed.
+
+        Parameters:
+        -----------
+        filename : str
+            The name the picture was stored under.
+        """
+		if filename != DEFAULT_PICTURE:
+			self.backend.delete(filename)
+
+	def url(self, filename):
+		"""
+        Return the URL of a stored picture.
+
+        Parameters:
+        -----------
+        filename : str
+            The picture's name, as kept in User.image_file.
+
+        Returns:
+        --------
+        str
+            The URL to use in an img tag.
+        """
+		if filename == DEFAULT_PICTURE:
+			return url_for('static', filename='assets/' + filename)
+		return self.backend.url(filename)
@@ -2,8 +2,25 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
-from flask_login import current_user
 from flaskblog.models import User
+from flaskblog.users.utils import check_picture
+
+
+def valid_username(form, field):
+	"""
+	Validator keeping usernames usable as a single URL path segment.
+
+	The /user/<username> route cannot match a '/', and the static export
+	writes each author's pages to a directory named after them.
+
+	Raises:
+	-------
+	ValidationError
+		If the username contains a '/' or consists only of dots.
+	"""
+	if '/' in field.data or not field.data.strip('.'):
+		raise ValidationError("Usernames cannot contain '/' or consist only of dots")
+
 
 class RegistrationForm(FlaskForm):
 	"""
@@ -21,53 +38,16 @@ class RegistrationForm(FlaskForm):
 		Field to confirm the password input, requires data and equality validation.
 	submit : SubmitField
 		Field for the form submission button.
+
+	Uniqueness of the username and email is not checked here; the register
+	route relies on the database's unique indexes instead (see add_duplicate_error).
 	"""
-	username = StringField('Username', validators=[DataRequired(), Length(min= 2, max=20)])
+	username = StringField('Username', validators=[DataRequired(), Length(min= 2, max=20), valid_username])
 	email = StringField('Email', validators=[DataRequired(), Email()])
 	password = PasswordField('Password', validators=[DataRequired()])
 	confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
 	submit = SubmitField('Sign Up')
 
-	def validate_username(self, username):
-		"""
-		Custom validator for the username field.
-
-		Checks if the username already exists in the database.
-
-		Parameters:
-		-----------
-		username : StringField
-			The field representing the username to be validated.
-
-		Raises:
-		-------
-		ValidationError
-			If the username already exists in the database.
-		"""
-		user = User.query.filter_by(username=username.data).first()
-		if user:
-			raise ValidationError('That username is not available. Try another one')
-
-	def validate_email(self, email):
-		"""
-		Custom validator for the email field.
-
-		Checks if the email already exists in the database.
-
-		Parameters:
-		-----------
-		email : StringField
-			The field representing the email to be validated.
-
-		Raises:
-		-------
-		ValidationError
-			If the email already exists in the database.
-		"""
-		user = User.query.filter_by(email=email.data).first()
-		if user:
-			raise ValidationError('That email has been taken. Try another one')
-
 
 class LoginForm(FlaskForm):
 	"""
@@ -104,54 +84,37 @@ class UpdateAccountForm(FlaskForm):
 		Field for updating the user's profile picture, allows only 'jpg' and 'png' file types.
 	submit : SubmitField
 		Field for the form submission button.
+
+	As with RegistrationForm, uniqueness of the username and email is enforced by the database.
 	"""
-	username = StringField('Username', validators=[DataRequired(), Length(min= 2, max=20)])
+	username = StringField('Username', validators=[DataRequired(), Length(min= 2, max=20), valid_username])
 	email = StringField('Email', validators=[DataRequired(), Email()])
 	picture = FileField('Update Profile Picture', validators=[FileAllowed(['jpg', 'png'])])
 	
 	submit = SubmitField('Update')
 
-	def validate_username(self, username):
-		"""
-		Custom validator for the username field during account update.
-
-		Checks if the new username already exists in the database and is different from the current user's username.
-
-		Parameters:
-		-----------
-		username : StringField
-			The field representing the new username to be validated.
-
-		Raises:
-		-------
-		ValidationError
-			If the username already exists in the database and is different from the current user's username.
-		"""
-		if username.data != current_user.username:
-			user = User.query.filter_by(username=username.data).first()
-			if user:
-				raise ValidationError('That username is not available. Try another one')
-
-	def validate_email(self, email):
+	def validate_picture(self, picture):
 		"""
-		Custom validator for the email field during account update.
+		Custom validator for the picture field during account update.
 
-		Checks if the new email already exists in the database and is different from the current user's email.
+		Sniffs the image header so that unreadable or oversized pictures are rejected before they are decoded.
+		The detected format is kept in picture_format for save_picture.
 
 		Parameters:
 		-----------
-		email : StringField
-			The field representing the new email to be validated.
+		picture : FileField
+			The field representing the uploaded picture to be validated.
 
 		Raises:
 		-------
 		ValidationError
-			If the email already exists in the database and is different from the current user's email.
+			If the upload is not a JPG/PNG image or its dimensions are too large.
 		"""
-		if email.data != current_user.email:
-			user = User.query.filter_by(email=email.data).first()
-			if user:
-				raise ValidationError('That email has been taken. Try another one')
+		if picture.data:
+			try:
+				self.picture_format = check_picture(picture.data)
+			except ValueError as e:
+				raise ValidationError(str(e))
 
 
 class RequestResetForm(FlaskForm):
@@ -1,14 +1,34 @@
-from flask import render_template, url_for, flash, redirect, request, Blueprint
+from flask import render_template, url_for, flash, redirect, request, Blueprint, current_app
 from flask_login import login_user, current_user, logout_user, login_required
-from flaskblog import db, bcrypt
+from sqlalchemy.exc import IntegrityError
+from flaskblog import db, bcrypt, storage
+from flaskblog.storage import StorageError
 from flaskblog.models import User, Post
 from flaskblog.users.forms import (RegistrationForm, LoginForm, UpdateAccountForm,
                                    RequestResetForm, ResetPasswordForm)
-from flaskblog.users.utils import save_picture, send_reset_email
+from flaskblog.users.utils import save_picture, send_reset_email, add_duplicate_error
+from flaskblog.main.utils import front_page, POSTS_PER_PAGE
 
 
 users =Blueprint('users', __name__)
 
+
+@users.app_errorhandler(413)
+def request_too_large(error):
+	"""
+    Error handler for request bodies larger than MAX_CONTENT_LENGTH.
+
+    Werkzeug refuses such requests before the upload is read, so this only
+    reports the problem back to the user.
+
+    Returns:
+    --------
+    Redirects to the page the oversized form was submitted from.
+    """
+	max_mb = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+	flash(f'That upload is too large. Files can be at most {max_mb}MB', 'danger')
+	return redirect(request.url)
+
 @users.route('/register', methods=['GET', 'POST'])
 def register():
 	"""
@@ -16,6 +36,7 @@ def register():
 
     If the user is already authenticated, redirects to the home page.
     Processes the RegistrationForm data, hashes the password, creates a new user, and commits to the database.
+    A taken username or email is detected by the unique indexes on insert and reported on the form.
 
     Returns:
     --------
@@ -30,9 +51,15 @@ def register():
 		hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
 		user = User(username=form.username.data, email=form.email.data, password=hashed_password)
 		db.session.add(user)
-		db.session.commit()
-		flash('Your Account has Been created! You can now log in!', 'success')
-		return redirect(url_for('users.login'))
+		try:
+			db.session.commit()
+		except IntegrityError as e:
+			db.session.rollback()
+			if not add_duplicate_error(form, e):
+				raise
+		else:
+			flash('Your Account has Been created! You can now log in!', 'success')
+			return redirect(url_for('users.login'))
 	return render_template('register.html', title= 'Register', form=form)
 
 
@@ -95,6 +122,10 @@ def account():
 	- Processes the UpdateAccountForm data.
 	- Updates the current user's username, email, and profile picture (if provided).
 	- Commits the changes to the database and redirects to the account page.
+	- Reports a taken username or email, detected by the unique indexes, on the form,
+	  and removes the picture saved for the failed update.
+	- Removes the previous picture once the new one is committed.
+	- Re-renders the form with an error message if the picture could not be stored.
 	- Displays a success message upon successful update.
 
 	Returns:
@@ -104,25 +135,43 @@ def account():
 	"""
 	form = UpdateAccountForm()
 	if form.validate_on_submit():
+		old_picture, picture_file = current_user.image_file, None
 		if form.picture.data:
-			picture_file = save_picture(form.picture.data)
+			try:
+				picture_file = save_picture(form.picture.data, form.picture_format)
+			except StorageError as e:
+				current_app.logger.error('Failed to store a profile picture: %s', e)
+				flash('Your profile picture could not be saved. Please try again later', 'danger')
+				return render_template('account.html', title='Account', image_file=storage.url(old_picture), form=form)
 			current_user.image_file = picture_file
 		current_user.username = form.username.data
 		current_user.email = form.email.data
-		db.session.commit()
-		flash('You have successfully updated your account', 'success')
-		return redirect(url_for('users.account'))
+		try:
+			db.session.commit()
+		except IntegrityError as e:
+			db.session.rollback()
+			if picture_file:
+				storage.delete(picture_file)
+			if not add_duplicate_error(form, e):
+				raise
+		else:
+			if picture_file:
+				storage.delete(old_picture)
+			front_page.author_updated(current_user)
+			flash('You have successfully updated your account', 'success')
+			return redirect(url_for('users.account'))
 	elif request.method == 'GET':
 		form.username.data = current_user.username
 		form.email.data = current_user.email
-	image_file = url_for('static', filename='assets/' + current_user.image_file)
+	image_file = storage.url(current_user.image_file)
 	return render_template('account.html', title='Account', image_file=image_file, form=form)
 
 
 
 
 @users.route("/user/<string:username>")
-def user_posts(username):
+@users.route("/user/<string:username>/page/<int:page>")
+def user_posts(username, page=1):
 	"""
     Route for displaying posts by a specific user.
 
@@ -130,14 +179,16 @@ def user_posts(username):
     -----------
     username : str
         The username of the user whose posts are to be displayed.
+    page : int
+        The page number, in the path so the page can be exported as a static file; ?page= is still accepted.
 
     Returns:
     --------
     Renders the user_post.html template with paginated posts and user information.
     """
-	page = request.args.get('page',1, type=int)
+	page = request.args.get('page',page, type=int)
 	user =User.query.filter_by(username=username).first_or_404()
-	posts = Post.query.filter_by(author=user).order_by(Post.date_posted.desc()).paginate(page=page, per_page=5)
+	posts = Post.query.filter_by(author=user).order_by(Post.date_posted.desc()).paginate(page=page, per_page=POSTS_PER_PAGE)
 	return render_template('user_post.html', posts=posts, user=user)
 
 
@@ -1,18 +1,139 @@
-import os
+import io
+import re
 import secrets
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 from flask import url_for, current_app
 from flask_mail import Message
-from flaskblog import mail
+from flaskblog import mail, storage
 
-def save_picture(form_picture):
+# Image formats accepted for profile pictures, mapped to the extension they are saved with
+PICTURE_FORMATS = {'JPEG': '.jpg', 'PNG': '.png'}
+PICTURE_CONTENT_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+# Form errors reported when a unique user column rejects a value
+DUPLICATE_MESSAGES = {
+	'username': 'That username is not available. Try another one',
+	'email': 'That email has been taken. Try another one',
+}
+
+# Unique indexes/constraints on the user table, as named by SQLite, PostgreSQL and MySQL, mapped to the form field they guard
+DUPLICATE_CONSTRAINTS = {
+	'ix_user_username_lower': 'username',
+	'user.username': 'username',
+	'user_username_key': 'username',
+	'username': 'username',
+	'ix_user_email_lower': 'email',
+	'user.email': 'email',
+	'user_email_key': 'email',
+	'email': 'email',
+}
+
+# Extracts the violated index/constraint name from a unique violation message
+UNIQUE_VIOLATION_RE = re.compile(
+	r"UNIQUE constraint failed: (?:index '(?P<sqlite_index>[\w.]+)'|(?P<sqlite_column>[\w.]+)$)"
+	r'|violates unique constraint "(?P<postgresql>[\w.]+)"'
+	r"|Duplicate entry .* for key '(?P<mysql>[\w.]+)'")
+
+
+def add_duplicate_error(form, error):
+	"""
+    Function to turn a unique constraint violation on the user table into a form error.
+
+    Uniqueness is left to the database so that a signup or account update is a
+    single write that cannot race with a concurrent one. The violated column
+    is recognised from the exact index or constraint name in a unique
+    violation, so other integrity errors (e.g. NOT NULL) are not mistaken for it.
+
+    Parameters:
+    -----------
+    form : FlaskForm
+        The form whose username/email field caused the violation.
+    error : IntegrityError
+        The error raised by the failed commit.
+
+    Returns:
+    --------
+    bool
+        True if the error was mapped onto a form field, False if it is unrelated.
+    """
+	match = UNIQUE_VIOLATION_RE.search(str(error.orig))
+	if match is None:
+		return False
+	field = DUPLICATE_CONSTRAINTS.get(next(name for name in match.groups() if name))
+	if field is None:
+		return False
+	form[field].errors.append(DUPLICATE_MESSAGES[field])
+	return True
+
+
+def check_picture(form_picture):
+	"""
+    Function to validate an uploaded profile picture from its header only.
+
+    The upload is never read into memory as a whole: Werkzeug spools file
+    parts larger than 500KB to a temporary file, requests above
+    MAX_CONTENT_LENGTH are refused before parsing, and Image.open only reads
+    the header, so the format and pixel dimensions are known before any
+    pixel data is decoded.
+
+    JPEGs are decoded at a reduced scale when thumbnailed, so only their
+    width/height is limited. Other formats are decoded at full size, so their
+    total pixel count is capped by MAX_PICTURE_PIXELS as well, which bounds the
+    memory an upload can take once decoded.
+
+    Parameters:
+    -----------
+    form_picture : FileStorage
+        The picture file uploaded via the form.
+
+    Returns:
+    --------
+    fmt : str
+        The detected image format, one of PICTURE_FORMATS.
+
+    Raises:
+    -------
+    ValueError
+        If the file is not a JPEG/PNG image or its dimensions exceed the configured limits.
+    """
+	stream = form_picture.stream
+	stream.seek(0)
+	try:
+		with Image.open(stream) as i:
+			fmt, size = i.format, i.size
+	except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+		raise ValueError('That file is not a valid image')
+	finally:
+		stream.seek(0)
+
+	if fmt not in PICTURE_FORMATS:
+		raise ValueError('Only JPG and PNG pictures are allowed')
+	max_dimension = current_app.config['MAX_PICTURE_DIMENSION']
+	if max(size) > max_dimension:
+		raise ValueError(f'Pictures can be at most {max_dimension}x{max_dimension} pixels')
+	max_pixels = current_app.config['MAX_PICTURE_PIXELS']
+	if fmt != 'JPEG' and size[0] * size[1] > max_pixels:
+		side = int(max_pixels ** 0.5)
+		raise ValueError(f'{fmt} pictures can have at most {max_pixels} pixels, e.g. {side}x{side}')
+	return fmt
+
+
+def save_picture(form_picture, fmt):
 	"""
-    Function to save a profile picture uploaded via a form.
+    Function to resize a profile picture uploaded via a form and hand it to the configured storage backend.
+
+    The picture must already have been checked with check_picture, and the
+    extension is taken from the detected format rather than the client
+    supplied filename. Image.thumbnail decodes JPEGs in draft mode at a
+    reduced scale; other formats are decoded in full, within the pixel cap
+    enforced by check_picture.
 
     Parameters:
     -----------
     form_picture : FileStorage
         The picture file uploaded via the form.
+    fmt : str
+        The format detected by check_picture, one of PICTURE_FORMATS.
 
     Returns:
     --------
@@ -20,14 +141,15 @@ def save_picture(form_picture):
         The filename of the saved picture.
     """
 	random_hex = secrets.token_hex(8)
-	_, f_ext = os.path.splitext(form_picture.filename)
-	picture_fn = random_hex + f_ext
-	picture_path = os.path.join(current_app.root_path,'static/assets', picture_fn)
+	picture_fn = random_hex + PICTURE_FORMATS[fmt]
 
 	output_size = (125, 125)
-	i = Image.open(form_picture)
-	i.thumbnail(output_size)
-	i.save(picture_path)
+	buffer = io.BytesIO()
+	form_picture.stream.seek(0)
+	with Image.open(form_picture.stream) as i:
+		i.thumbnail(output_size)
+		i.save(buffer, format=fmt)
+	storage.save(picture_fn, buffer.getvalue(), PICTURE_CONTENT_TYPES[fmt])
 
 	return picture_fn
 
@@ -0,0 +1,113 @@
+import os
+import sys
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from flaskblog import create_app, db, bcrypt
+from flaskblog.config import Config
+from flaskblog.models import User
+
+
+def make_config(directory):
+	"""
+    Build a configuration class using a fresh SQLite database in directory.
+    """
+	class TestConfig(Config):
+		SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'test.db')}"
+		WTF_CSRF_ENABLED = False
+	return TestConfig
+
+
+def make_app(config_class, directory):
+	"""
+    Create an application whose instance folder and local pictures live in directory.
+    """
+	app = create_app(config_class)
+	app.instance_path = os.path.join(directory, 'instance')
+	backend = app.extensions['storage']
+	if hasattr(backend, 'directory'):
+		# Keep uploaded pictures out of the app's static folder
+		backend.directory = str(directory)
+	with app.app_context():
+		db.create_all()
+	return app
+
+
+def add_user(username='alice', email='alice@example.com'):
+	"""
+    Create a user whose password is 'password'.
+    """
+	user = User(username=username, email=email,
+				password=bcrypt.generate_password_hash('password').decode('utf-8'))
+	db.session.add(user)
+	db.session.commit()
+	return user
+
+
+def log_in(client, email='alice@example.com'):
+	"""
+    Log a test client in as the user with the given email.
+    """
+	return client.post('/login', data={'email': email, 'password': 'password'})
+
+
+@pytest.fixture
+def config(tmp_path):
+	"""
+    The configuration class of the app fixture; override it to change settings.
+    """
+	return make_config(tmp_path)
+
+
+@pytest.fixture
+def app(config, tmp_path):
+	"""
+    An application backed by a fresh SQLite database in a temporary directory.
+    """
+	app = make_app(config, tmp_path)
+	with app.app_context():
+		yield app
+		db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+	return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+	"""
+    Factory creating a user whose password is 'password'.
+    """
+	return add_user
+
+
+@pytest.fixture
+def login(client):
+	"""
+    Logs the test client in as the given user.
+    """
+	return lambda email='alice@example.com': log_in(client, email)
+
+
+@pytest.fixture
+def count_queries(app):
+	"""
+    Context manager collecting the SQL statements executed inside it.
+    """
+	@contextmanager
+	def count_queries():
+		statements = []
+		def record(conn, cursor, statement, parameters, context, executemany):
+			statements.append(statement)
+		event.listen(db.engine, 'before_cursor_execute', record)
+		try:
+			yield statements
+		finally:
+			event.remove(db.engine, 'before_cursor_execute', record)
+	return count_queries
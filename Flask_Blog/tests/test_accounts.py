@@ -0,0 +1,80 @@
+import io
+import os
+import threading
+import pytest
+from PIL import Image
+from sqlalchemy.exc import IntegrityError
+from flaskblog import db
+from flaskblog.models import User
+from flaskblog.users.forms import RegistrationForm
+from flaskblog.users.utils import add_duplicate_error
+
+SIGNUPS = 8
+
+
+def signup(client, username='bob', email='bob@example.com'):
+	return client.post('/register', data={'username': username, 'email': email,
+										  'password': 'password', 'confirm_password': 'password'})
+
+
+def test_signup_is_a_single_insert(client, count_queries):
+	with count_queries() as statements:
+		response = signup(client)
+	assert response.status_code == 302
+	assert len(statements) == 1
+	assert statements[0].startswith('INSERT INTO user')
+
+
+@pytest.mark.parametrize('username, email, message', [
+	('ALICE', 'other@example.com', 'That username is not available'),
+	('other', 'Alice@Example.com', 'That email has been taken'),
+], ids=['username', 'email'])
+def test_duplicates_are_reported_on_the_form(client, make_user, username, email, message):
+	make_user()
+	response = signup(client, username, email)
+	assert response.status_code == 200
+	assert message in response.get_data(as_text=True)
+	assert User.query.count() == 1
+
+
+def test_concurrent_signups_create_one_account(app):
+	barrier = threading.Barrier(SIGNUPS)
+	statuses = []
+	def run():
+		client = app.test_client()
+		barrier.wait()
+		statuses.append(signup(client).status_code)
+	threads = [threading.Thread(target=run) for _ in range(SIGNUPS)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert sorted(statuses) == [200] * (SIGNUPS - 1) + [302]
+	assert User.query.filter_by(username='bob').count() == 1
+
+
+def test_other_integrity_errors_are_not_reported_as_duplicates(app):
+	db.session.add(User(username=None, email='x@example.com', password='x'))
+	with pytest.raises(IntegrityError) as info:
+		db.session.commit()
+	db.session.rollback()
+	with app.test_request_context(method='POST'):
+		form = RegistrationForm()
+		assert not add_duplicate_error(form, info.value)
+		assert not form.username.errors and not form.email.errors
+
+
+def test_failed_update_removes_the_new_picture(app, client, make_user, login):
+	make_user()
+	make_user('bob', 'bob@example.com')
+	login()
+	picture = io.BytesIO()
+	Image.new('RGB', (200, 200), 'red').save(picture, 'PNG')
+	directory = app.extensions['storage'].directory
+	before = set(os.listdir(directory))
+	response = client.post('/account', data={'username': 'alice', 'email': 'bob@example.com',
+											  'picture': (io.BytesIO(picture.getvalue()), 'me.png')},
+						   content_type='multipart/form-data')
+	assert 'That email has been taken' in response.get_data(as_text=True)
+	assert set(os.listdir(directory)) == before
+	assert db.session.get(User, 1).image_file == 'default.jpg'
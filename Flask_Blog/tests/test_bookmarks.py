@@ -0,0 +1,55 @@
+import re
+import html
+from datetime import datetime, timedelta
+from flaskblog import db
+from flaskblog.models import Post, Bookmark
+from flaskblog.main.utils import POSTS_PER_PAGE
+
+POSTS = 2 * POSTS_PER_PAGE + 2
+
+
+def bookmark_posts(user):
+	start = datetime(2024, 1, 1)
+	posts = [Post(title=f'Post #{n:02d}', content='...', author=user, date_posted=start + timedelta(hours=n))
+			 for n in range(POSTS)]
+	db.session.add_all(posts)
+	db.session.flush()
+	# Bookmarked in posting order, so the listing shows the newest first
+	db.session.add_all(Bookmark(user_id=user.id, post_id=post.id, date_bookmarked=post.date_posted)
+					   for post in posts)
+	db.session.commit()
+	return posts
+
+
+def read_page(client, url):
+	page = client.get(url).get_data(as_text=True)
+	titles = re.findall(r'>Post #(\d+)<', page)
+	next_url = re.search(r'href="([^"]*before=[^"]*)"', page)
+	return [int(n) for n in titles], html.unescape(next_url.group(1)) if next_url else None
+
+
+def test_bookmarks_page_through_every_post_once(client, make_user, login):
+	bookmark_posts(make_user())
+	login()
+	seen, url = [], '/bookmarks'
+	while url:
+		titles, url = read_page(client, url)
+		assert len(titles) <= POSTS_PER_PAGE
+		seen += titles
+	assert seen == list(reversed(range(POSTS)))
+
+
+def test_next_page_survives_removing_the_cursor_post(client, make_user, login):
+	posts = bookmark_posts(make_user())
+	login()
+	first, next_url = read_page(client, '/bookmarks')
+	# Unbookmark the last post of the first page, which the cursor points at
+	client.post(f'/post/{posts[first[-1]].id}/bookmark')
+	second, _ = read_page(client, next_url)
+	assert second == [first[-1] - n for n in range(1, POSTS_PER_PAGE + 1)]
+
+
+def test_malformed_cursor_shows_the_first_page(client, make_user, login):
+	bookmark_posts(make_user())
+	login()
+	assert read_page(client, '/bookmarks?before=junk')[0] == read_page(client, '/bookmarks')[0]
@@ -0,0 +1,116 @@
+import os
+import logging
+from pathlib import Path
+import pytest
+from flaskblog import db
+from flaskblog.models import Post, User
+from flaskblog.main.export import SiteExport, url_to_path
+from flaskblog.main.utils import POSTS_PER_PAGE
+
+
+def add_posts(user, count=1):
+	for n in range(count):
+		db.session.add(Post(title=f'Post {n} by {user.username}', content='...', author=user))
+	db.session.commit()
+
+
+@pytest.mark.parametrize('url', ['/user/..', '/user/../..', '/user/%2E%2E/%2E%2E/etc'])
+def test_url_to_path_stays_inside_the_directory(tmp_path, url):
+	with pytest.raises(ValueError):
+		url_to_path(str(tmp_path), url)
+
+
+def test_url_to_path_maps_pages_to_index_files(tmp_path):
+	assert url_to_path(str(tmp_path), '/user/alice') == os.path.join(str(tmp_path), 'user/alice/index.html')
+	assert url_to_path(str(tmp_path), '/feed.xml') == os.path.join(str(tmp_path), 'feed.xml')
+
+
+def test_authors_with_unsafe_names_are_skipped(app, make_user, tmp_path, caplog):
+	add_posts(make_user())
+	add_posts(make_user('..', 'dots@example.com'))
+	add_posts(make_user('a/b', 'slash@example.com'))
+	directory = tmp_path / 'public'
+
+	with caplog.at_level(logging.WARNING):
+		SiteExport(app, str(directory)).run()
+
+	assert 'Skipping the pages of author' in caplog.text
+	assert (directory / 'user/alice/index.html').exists()
+	assert not (directory / 'user/a').exists()
+	# The home page, not the pages of the author named '..'
+	home = (directory / 'index.html').read_text()
+	assert all(f'Post 0 by {name}' in home for name in ('alice', '..', 'a/b'))
+
+
+@pytest.mark.parametrize('username', ['..', '...', 'a/b'])
+def test_unsafe_usernames_are_rejected_on_signup(client, username):
+	response = client.post('/register', data={'username': username, 'email': 'bob@example.com',
+											  'password': 'password', 'confirm_password': 'password'})
+	assert response.status_code == 200
+	assert 'Usernames cannot contain' in response.get_data(as_text=True)
+
+
+def test_author_pages_use_the_site_page_size(client, make_user):
+	add_posts(make_user(), POSTS_PER_PAGE + 1)
+	page = client.get('/user/alice').get_data(as_text=True)
+	assert page.count('Post ') == POSTS_PER_PAGE
+
+
+@pytest.fixture
+def site(app, make_user, tmp_path, monkeypatch):
+	"""
+    Two authors with POSTS_PER_PAGE + 1 posts between them, exported once;
+    returns the export, which records the URLs each later run renders.
+    """
+	alice, bob = make_user(), make_user('bob', 'bob@example.com')
+	add_posts(alice, 2)
+	add_posts(bob, POSTS_PER_PAGE - 1)
+	export = SiteExport(app, str(tmp_path / 'public'))
+	export.run()
+	export.urls = []
+	render = export._render
+	def record(url):
+		export.urls.append(url)
+		render(url)
+	monkeypatch.setattr(export, '_render', record)
+	return export
+
+
+def test_unchanged_site_renders_nothing(site):
+	assert site.run() == 0
+	assert site.urls == []
+
+
+def test_edit_renders_only_the_affected_pages(site):
+	post = Post.query.filter_by(title='Post 0 by alice').one()
+	post.title = 'Edited'
+	db.session.commit()
+	site.run()
+	alice_posts = [f'/post/{p.id}' for p in Post.query.filter_by(user_id=post.user_id)]
+	# The alice posts are the oldest two, so they sit on the second home page
+	assert sorted(site.urls) == sorted(alice_posts + ['/user/alice', '/user/alice/page/1',
+													  '/home/page/2', '/feed.xml'])
+	assert 'Edited' in (Path(site.directory) / f'post/{post.id}/index.html').read_text()
+
+
+def test_delete_removes_the_post_and_trailing_home_pages(site):
+	directory = Path(site.directory)
+	post = Post.query.filter_by(title='Post 0 by alice').one()
+	assert (directory / 'home/page/2/index.html').exists()
+	db.session.delete(post)
+	db.session.commit()
+	site.run()
+	assert not (directory / f'post/{post.id}').exists()
+	assert not (directory / 'home/page/2').exists()
+	assert (directory / 'home/page/1/index.html').exists()
+
+
+def test_rename_moves_the_author_pages(site):
+	directory = Path(site.directory)
+	user = db.session.get(User, 1)
+	user.username = 'alicia'
+	db.session.commit()
+	site.run()
+	assert not (directory / 'user/alice').exists()
+	assert (directory / 'user/alicia/index.html').exists()
+	assert (directory / 'user/alicia/page/1/index.html').exists()
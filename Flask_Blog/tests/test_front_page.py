@@ -0,0 +1,88 @@
+import os
+import threading
+import pytest
+from flaskblog import db
+from flaskblog.models import Post
+from flaskblog.main.utils import FrontPage, POSTS_PER_PAGE, fcntl
+
+
+def add_post(user, title):
+	post = Post(title=title, content='...', author=user)
+	db.session.add(post)
+	db.session.commit()
+	return post
+
+
+@pytest.mark.skipif(fcntl is None, reason='needs flock')
+def test_changes_wait_for_the_stamp_lock(app, make_user):
+	user = make_user()
+	front_page = FrontPage()
+	front_page.get()
+	post = add_post(user, 'First')
+
+	# Another worker holding the lock, e.g. in the middle of its own change
+	fd = os.open(front_page._stamp_path(), os.O_RDWR)
+	fcntl.flock(fd, fcntl.LOCK_EX)
+	stamp = front_page._read_stamp()
+
+	def apply():
+		with app.app_context():
+			front_page.post_created(post)
+	worker = threading.Thread(target=apply)
+	worker.start()
+	worker.join(0.5)
+	assert worker.is_alive()
+	assert front_page._read_stamp() == stamp
+
+	os.close(fd)
+	worker.join(5)
+	assert not worker.is_alive()
+	assert front_page._read_stamp() != stamp
+	assert [entry.id for entry in front_page.get().items] == [post.id]
+
+
+def test_stale_worker_rebuilds_instead_of_applying(app, make_user):
+	user = make_user()
+	first, second = FrontPage(), FrontPage()
+	first.get()
+	second.get()
+
+	post = add_post(user, 'First')
+	first.post_created(post)
+	# second still holds the previous version and must not apply on top of it
+	other = add_post(user, 'Second')
+	second.post_created(other)
+
+	assert [entry.id for entry in second.get().items] == [other.id, post.id]
+	assert [entry.id for entry in first.get().items] == [other.id, post.id]
+
+
+def test_edits_handled_by_a_cold_worker_reach_the_serving_one(app, make_user):
+	user = make_user()
+	post = add_post(user, 'Old')
+	serving, cold = FrontPage(), FrontPage()
+	assert [entry.title for entry in serving.get().items] == ['Old']
+
+	post.title = 'New'
+	db.session.commit()
+	cold.post_updated(post)
+	assert [entry.title for entry in serving.get().items] == ['New']
+
+	user.username = 'alicia'
+	db.session.commit()
+	cold.author_updated(user)
+	assert [entry.author.username for entry in serving.get().items] == ['alicia']
+
+
+def test_current_worker_skips_changes_off_the_page(app, make_user):
+	user = make_user()
+	hidden = add_post(user, 'Hidden')
+	for n in range(POSTS_PER_PAGE):
+		add_post(user, f'Post {n}')
+	worker = FrontPage()
+	worker.get()
+	stamp = worker._read_stamp()
+	hidden.title = 'Still hidden'
+	db.session.commit()
+	worker.post_updated(hidden)
+	assert worker._read_stamp() == stamp
@@ -0,0 +1,54 @@
+import os
+import sys
+import subprocess
+import pytest
+from flaskblog import db
+from flaskblog.models import Post, RelatedPost
+
+pytest.importorskip('scipy')
+
+from flaskblog.posts.related import tfidf_matrix, most_similar
+
+DOCUMENTS = [
+	'Baking sourdough bread at home with a starter',
+	'A sourdough starter needs flour and water every day',
+	'Tuning SQLite indexes for a Flask blog',
+	'Flask blog performance: SQLite indexes and query plans',
+	'Nothing in common here at all',
+]
+
+
+def test_web_app_does_not_load_numpy():
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	code = ('import sys; from flaskblog import create_app; create_app(); '
+			"print(sorted(m for m in ('numpy', 'scipy') if m in sys.modules))")
+	result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+							env=dict(os.environ, PYTHONPATH=root, SECRET_KEY='test-secret-key',
+									 SQLALCHEMY_DATABASE_URI='sqlite://'))
+	assert result.stdout.strip() == '[]'
+
+
+def test_tfidf_matrix_is_sparse_with_unit_rows():
+	matrix = tfidf_matrix(DOCUMENTS)
+	assert matrix.format == 'csr'
+	assert matrix.nnz < matrix.shape[0] * matrix.shape[1]
+	norms = matrix.multiply(matrix).sum(axis=1).A1
+	assert norms[:4] == pytest.approx([1, 1, 1, 1], abs=1e-5)
+	assert norms[4] == 0  # shares no term with the other posts
+
+
+def test_most_similar_pairs_posts_on_the_same_topic():
+	neighbours = most_similar(tfidf_matrix(DOCUMENTS), top_n=1, block_size=2)
+	assert [n[0][0] for n in neighbours[:4]] == [1, 0, 3, 2]
+	assert neighbours[4] == []
+
+
+def test_related_command_stores_links(app, make_user):
+	user = make_user()
+	for document in DOCUMENTS:
+		db.session.add(Post(title=document, content=document, author=user))
+	db.session.commit()
+	result = app.test_cli_runner().invoke(args=['posts', 'related', '--top', '1'])
+	assert result.exit_code == 0, result.output
+	links = {link.post_id: link.related_id for link in RelatedPost.query}
+	assert links == {1: 2, 2: 1, 3: 4, 4: 3}
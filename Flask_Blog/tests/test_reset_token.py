@@ -0,0 +1,66 @@
+import time
+import timeit
+import pytest
+from itsdangerous import URLSafeTimedSerializer
+from flaskblog import db, bcrypt
+from flaskblog.models import User, RESET_TOKEN_SALT
+
+ROUNDS = 1000
+
+
+def bench(name, fn):
+	seconds = timeit.timeit(fn, number=ROUNDS) / ROUNDS
+	print(f'{name}: {seconds * 1e6:.1f}us per call')
+
+
+def tampered(token):
+	return token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+
+
+def expired(app, user):
+	s = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=RESET_TOKEN_SALT)
+	return s.dumps({'user_id': user.id, 'exp': int(time.time()) - 1, 'fp': user.password_fingerprint()})
+
+
+def test_valid_token_is_accepted_with_one_query(app, make_user, count_queries):
+	user = make_user()
+	token = user.get_reset_token()
+	db.session.expire_all()
+	with count_queries() as statements:
+		assert User.verify_reset_token(token).id == user.id
+	assert len(statements) == 1
+
+
+@pytest.mark.parametrize('make_token', [
+	lambda app, user: tampered(user.get_reset_token()),
+	lambda app, user: 'not-a-token',
+	expired,
+	lambda app, user: URLSafeTimedSerializer(app.config['SECRET_KEY']).dumps({'user_id': user.id}),
+], ids=['tampered', 'malformed', 'expired', 'wrong-salt'])
+def test_bad_tokens_are_rejected_without_queries(app, make_user, count_queries, make_token):
+	user = make_user()
+	token = make_token(app, user)
+	with count_queries() as statements:
+		assert User.verify_reset_token(token) is None
+	assert statements == []
+
+
+def test_used_token_cannot_be_replayed(app, make_user, count_queries):
+	user = make_user()
+	token = user.get_reset_token()
+	user.password = bcrypt.generate_password_hash('new password').decode('utf-8')
+	db.session.commit()
+	db.session.expire_all()
+	with count_queries() as statements:
+		assert User.verify_reset_token(token) is None
+	assert len(statements) == 1
+
+
+def test_reset_token_benchmark(app, make_user):
+	user = make_user()
+	token = user.get_reset_token()
+	bad_token, old_token = tampered(token), expired(app, user)
+	bench('sign', user.get_reset_token)
+	bench('verify valid', lambda: User.verify_reset_token(token))
+	bench('reject tampered', lambda: User.verify_reset_token(bad_token))
+	bench('reject expired', lambda: User.verify_reset_token(old_token))
@@ -0,0 +1,67 @@
+import pytest
+from test_storage import FAILED_UPLOAD, upload_picture, current_picture
+
+@pytest.fixture
+def stub():
+	return pytest.importorskip('botocore.stub')
+
+
+@pytest.fixture(params=[None, 'public-read'], ids=['no-acl', 'public-read'])
+def config(request, config, stub, monkeypatch):
+	monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+	monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+	monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+
+	class S3Config(config):
+		STORAGE_BACKEND = 's3'
+		S3_BUCKET = 'avatars'
+		S3_OBJECT_ACL = request.param
+	return S3Config
+
+
+@pytest.fixture
+def s3_client(app, client, make_user, login):
+	make_user()
+	login()
+	return client
+
+
+def put_params(stub, backend):
+	params = {'Bucket': 'avatars', 'Key': stub.ANY, 'Body': stub.ANY, 'ContentType': 'image/png'}
+	if backend.acl:
+		params['ACL'] = backend.acl
+	return params
+
+
+def test_picture_is_uploaded_before_it_is_referenced(app, s3_client, stub):
+	backend = app.extensions['storage']
+	with stub.Stubber(backend.client) as stubber:
+		stubber.add_response('put_object', {}, put_params(stub, backend))
+		response = upload_picture(s3_client)
+		stubber.assert_no_pending_responses()
+	assert response.status_code == 302
+	assert current_picture().endswith('.png')
+
+
+def test_failed_upload_is_reported_on_the_form(app, s3_client, stub):
+	backend = app.extensions['storage']
+	with stub.Stubber(backend.client) as stubber:
+		stubber.add_client_error('put_object', 'AccessControlListNotSupported', http_status_code=400)
+		response = upload_picture(s3_client)
+	assert response.status_code == 200
+	assert FAILED_UPLOAD in response.get_data(as_text=True)
+	assert current_picture() == 'default.jpg'
+
+
+def test_replaced_object_is_deleted_in_the_background(app, s3_client, stub):
+	backend = app.extensions['storage']
+	with stub.Stubber(backend.client) as stubber:
+		stubber.add_response('put_object', {}, put_params(stub, backend))
+		upload_picture(s3_client)
+		first = current_picture()
+		stubber.add_response('put_object', {}, put_params(stub, backend))
+		stubber.add_response('delete_object', {}, {'Bucket': 'avatars', 'Key': first})
+		upload_picture(s3_client, 'blue')
+		backend.executor.shutdown(wait=True)
+		stubber.assert_no_pending_responses()
+	assert current_picture() != first
@@ -0,0 +1,46 @@
+import io
+import os
+import pytest
+from PIL import Image
+from flaskblog import db
+from flaskblog.models import User
+
+FAILED_UPLOAD = 'Your profile picture could not be saved'
+
+
+def upload_picture(client, color='red'):
+	picture = io.BytesIO()
+	Image.new('RGB', (200, 200), color).save(picture, 'PNG')
+	picture.seek(0)
+	return client.post('/account', data={'username': 'alice', 'email': 'alice@example.com',
+										 'picture': (picture, 'me.png')}, content_type='multipart/form-data')
+
+
+def current_picture():
+	db.session.expire_all()
+	return db.session.get(User, 1).image_file
+
+
+def test_replaced_picture_is_deleted(app, client, make_user, login):
+	make_user()
+	login()
+	directory = app.extensions['storage'].directory
+	upload_picture(client)
+	first = current_picture()
+	assert os.path.exists(os.path.join(directory, first))
+
+	upload_picture(client, 'blue')
+	second = current_picture()
+	assert second != first
+	assert os.path.exists(os.path.join(directory, second))
+	assert not os.path.exists(os.path.join(directory, first))
+
+
+def test_failed_write_is_reported_on_the_form(app, client, make_user, login, tmp_path):
+	make_user()
+	login()
+	app.extensions['storage'].directory = str(tmp_path / 'missing')
+	response = upload_picture(client)
+	assert response.status_code == 200
+	assert FAILED_UPLOAD in response.get_data(as_text=True)
+	assert current_picture() == 'default.jpg'
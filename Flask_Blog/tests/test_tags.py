@@ -0,0 +1,77 @@
+import re
+import html
+from flaskblog import db
+from flaskblog.models import Post, Tag
+from flaskblog.posts.utils import set_post_tags
+from flaskblog.main.utils import POSTS_PER_PAGE
+
+
+class RacingQuery:
+	"""
+    Stands in for Tag.query, missing the first lookup as if another request
+    created the tag right after it.
+    """
+	def __init__(self, query):
+		self.query = query
+		self.missed = False
+
+	def filter_by(self, **kwargs):
+		if not self.missed:
+			self.missed = True
+			return self.query.filter(db.false())
+		return self.query.filter_by(**kwargs)
+
+
+def new_post(client, tags):
+	return client.post('/post/new', data={'title': 'Hello', 'content': 'World', 'tags': tags})
+
+
+def test_tags_are_created_and_counted(client, make_user, login):
+	make_user()
+	login()
+	new_post(client, 'python, flask')
+	new_post(client, 'Python')
+	assert {tag.name: tag.post_count for tag in Tag.query} == {'python': 2, 'flask': 1}
+	assert client.get('/tag/python').status_code == 200
+
+
+def test_tags_with_a_slash_are_rejected(client, make_user, login):
+	make_user()
+	login()
+	response = new_post(client, 'c/c++')
+	assert response.status_code == 200
+	assert "Tags cannot contain &#39;/&#39;" in response.get_data(as_text=True)
+	assert Post.query.count() == 0
+
+
+def test_concurrently_created_tag_is_reused(app, make_user, monkeypatch):
+	user = make_user()
+	db.session.add(Tag(name='python', post_count=1))
+	db.session.commit()
+	monkeypatch.setattr(Tag, 'query', RacingQuery(Tag.query))
+
+	post = Post(title='Hello', content='World', author=user)
+	db.session.add(post)
+	set_post_tags(post, ['python'])
+	db.session.commit()
+
+	monkeypatch.undo()
+	tag = Tag.query.one()
+	assert tag.post_count == 2
+	assert [t.name for t in post.tags] == ['python']
+
+
+def test_tag_pages_continue_after_the_cursor_post_is_untagged(client, make_user, login):
+	make_user()
+	login()
+	for n in range(2 * POSTS_PER_PAGE):
+		client.post('/post/new', data={'title': f'Post #{n:02d}', 'content': '...', 'tags': 'python'})
+	page = client.get('/tag/python').get_data(as_text=True)
+	first = [int(n) for n in re.findall(r'>Post #(\d+)<', page)]
+	next_url = html.unescape(re.search(r'href="([^"]*before=[^"]*)"', page).group(1))
+	assert first == list(range(2 * POSTS_PER_PAGE - 1, POSTS_PER_PAGE - 1, -1))
+
+	cursor_post = Post.query.filter_by(title=f'Post #{first[-1]:02d}').one()
+	client.post(f'/post/{cursor_post.id}/update', data={'title': cursor_post.title, 'content': '...', 'tags': ''})
+	page = client.get(next_url).get_data(as_text=True)
+	assert [int(n) for n in re.findall(r'>Post #(\d+)<', page)] == list(range(POSTS_PER_PAGE - 1, -1, -1))
@@ -0,0 +1,107 @@
+import io
+import os
+import sys
+import json
+import subprocess
+import pytest
+from PIL import Image
+
+if not os.path.exists('/proc/self/clear_refs'):
+	pytest.skip('measuring peak RSS needs Linux /proc', allow_module_level=True)
+
+# Extra resident memory a single accepted upload may take, in KB
+MEMORY_CEILING_KB = 16 * 1024
+
+# Runs one avatar upload in a fresh interpreter, set up with the conftest
+# helpers, and reports how much the peak RSS grew. tracemalloc cannot see
+# Pillow's C allocations, so RSS is used; a warm-up upload first loads every
+# module and code path involved, then the kernel's peak RSS (VmHWM) is reset
+# just before the measured upload.
+UPLOAD_SCRIPT = r"""
+import io, os, re, sys, json
+from PIL import Image
+from conftest import make_config, make_app, add_user, log_in
+
+app = make_app(make_config(sys.argv[1]), sys.argv[1])
+with app.app_context():
+	add_user()
+client = app.test_client()
+log_in(client)
+with open(sys.argv[2], 'rb') as f:
+	data = f.read()
+fmt = sys.argv[3]
+extension = {'JPEG': 'jpg', 'PNG': 'png'}[fmt]
+
+def upload(content, name):
+	response = client.post('/account', data={'username': 'alice', 'email': 'alice@example.com',
+						   'picture': (io.BytesIO(content), name)}, content_type='multipart/form-data')
+	return response.status_code
+
+small = io.BytesIO()
+Image.new('RGB', (200, 200), 'blue').save(small, fmt)
+upload(small.getvalue(), 'warmup.' + extension)
+def rss(field):
+	with open('/proc/self/status') as f:
+		return int(re.search(field + r':\s+(\d+)', f.read()).group(1))
+
+with open('/proc/self/clear_refs', 'w') as f:
+	f.write('5')
+before = rss('VmRSS')
+status = upload(data, 'picture.' + extension)
+after = rss('VmHWM')
+print(json.dumps({'status': status, 'peak_kb': after - before}))
+"""
+
+
+def measure_upload(tmp_path, size, fmt):
+	path = tmp_path / f'picture.{fmt.lower()}'
+	Image.new('RGB', size, 'red').save(path, fmt)
+	env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+	result = subprocess.run([sys.executable, '-c', UPLOAD_SCRIPT, str(tmp_path), str(path), fmt],
+							capture_output=True, text=True, env=env, check=True)
+	report = json.loads(result.stdout.strip().splitlines()[-1])
+	print(f"{fmt} {size[0]}x{size[1]} ({path.stat().st_size // 1024}KB): status {report['status']}, "
+		  f"peak RSS +{report['peak_kb']}KB")
+	return report
+
+
+@pytest.mark.parametrize('size, fmt, status', [
+	((4096, 4096), 'JPEG', 302),
+	((1024, 1024), 'PNG', 302),
+	((4096, 4096), 'PNG', 200),
+], ids=['jpeg-4096', 'png-1024', 'png-4096-rejected'])
+def test_upload_memory_stays_under_ceiling(tmp_path, size, fmt, status):
+	report = measure_upload(tmp_path, size, fmt)
+	assert report['status'] == status
+	assert report['peak_kb'] < MEMORY_CEILING_KB
+
+
+def picture_form(content, name):
+	return {'username': 'alice', 'email': 'alice@example.com', 'picture': (io.BytesIO(content), name)}
+
+
+def encoded(size, fmt):
+	buffer = io.BytesIO()
+	Image.new('RGB', size, 'red').save(buffer, fmt)
+	return buffer.getvalue()
+
+
+@pytest.mark.parametrize('content, name, message', [
+	(encoded((4100, 10), 'JPEG'), 'wide.jpg', 'at most 4096x4096 pixels'),
+	(encoded((1100, 1100), 'PNG'), 'big.png', 'PNG pictures can have at most'),
+	(b'not an image' * 100, 'junk.jpg', 'not a valid image'),
+], ids=['too-wide', 'too-many-pixels', 'not-an-image'])
+def test_invalid_pictures_are_rejected(client, make_user, login, content, name, message):
+	make_user()
+	login()
+	response = client.post('/account', data=picture_form(content, name), content_type='multipart/form-data')
+	assert response.status_code == 200
+	assert message in response.get_data(as_text=True)
+
+
+def test_oversized_request_is_refused(client, make_user, login):
+	make_user()
+	login()
+	response = client.post('/account', data=picture_form(b'\0' * (3 * 1024 * 1024), 'huge.jpg'),
+						   content_type='multipart/form-data', follow_redirects=True)
+	assert 'That upload is too large' in response.get_data(as_text=True)
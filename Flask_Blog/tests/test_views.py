@@ -0,0 +1,128 @@
+import time
+import multiprocessing
+from collections import Counter
+import pytest
+from sqlalchemy.exc import OperationalError
+from flaskblog import create_app, db
+from flaskblog.models import Post, PostViewCount
+from flaskblog.main.export import SiteExport
+from flaskblog.posts import counters
+from flaskblog.posts.counters import FileBackend, view_counter
+
+VIEWS_PER_WORKER = 200
+
+
+@pytest.fixture(autouse=True)
+def close_view_counter(app):
+	"""
+    Give every test a fresh view buffer and stop its flushing thread afterwards.
+    """
+	view_counter.close()
+	yield
+	view_counter.close()
+
+
+def add_posts(user, count):
+	posts = [Post(title=f'Post {n}', content='...', author=user) for n in range(count)]
+	db.session.add_all(posts)
+	db.session.commit()
+	return posts
+
+
+def stored_views():
+	db.session.expire_all()
+	return {row.post_id: row.views for row in PostViewCount.query}
+
+
+def test_views_are_counted_and_shown(client, make_user):
+	add_posts(make_user(), 1)
+	client.get('/post/1')
+	page = client.get('/post/1').get_data(as_text=True)
+	assert '2 views' in page
+
+
+def test_exported_post_pages_have_no_view_count(app, make_user, tmp_path):
+	add_posts(make_user(), 1)
+	SiteExport(app, str(tmp_path / 'public')).run()
+	page = (tmp_path / 'public/post/1/index.html').read_text()
+	assert 'Post 0' in page
+	assert 'views' not in page
+	assert view_counter.flush() == 0
+
+
+def test_flush_is_one_update_and_one_insert(app, make_user, count_queries):
+	posts = add_posts(make_user(), 4)
+	db.session.add_all([PostViewCount(post_id=posts[0].id, views=5), PostViewCount(post_id=posts[1].id, views=1)])
+	db.session.commit()
+	for post in posts:
+		for _ in range(post.id):
+			view_counter.record(post.id)
+
+	with count_queries() as statements:
+		assert view_counter.flush() == 1 + 2 + 3 + 4
+	assert [s.split()[0] for s in statements if not s.startswith('SELECT')] == ['UPDATE', 'INSERT']
+	assert stored_views() == {1: 6, 2: 3, 3: 3, 4: 4}
+
+
+def test_failed_flush_keeps_the_views(app, make_user, monkeypatch):
+	add_posts(make_user(), 1)
+	view_counter.record(1)
+	view_counter.record(1)
+	def fail(counts):
+		raise OperationalError('UPDATE', {}, Exception('database is locked'))
+	monkeypatch.setattr(counters, 'write_counts', fail)
+	assert view_counter.flush() == 0
+	monkeypatch.undo()
+	assert view_counter.flush() == 2
+	assert stored_views() == {1: 2}
+
+
+def test_views_are_flushed_without_further_requests(client, make_user, app):
+	add_posts(make_user(), 1)
+	app.config['VIEW_FLUSH_INTERVAL'] = 0.05
+	client.get('/post/1')
+	deadline = time.monotonic() + 5
+	while stored_views() != {1: 1} and time.monotonic() < deadline:
+		time.sleep(0.05)
+	assert stored_views() == {1: 1}
+
+
+def test_each_app_gets_its_own_backend(app, config):
+	class FileConfig(config):
+		VIEW_COUNTER_BACKEND = 'file'
+	other = create_app(FileConfig)
+	other.instance_path = app.instance_path
+	view_counter.record(1)
+	with other.app_context():
+		view_counter.record(1)
+		assert isinstance(other.extensions['view_counter'].backend, FileBackend)
+		view_counter.close()
+	assert not isinstance(app.extensions['view_counter'].backend, FileBackend)
+
+
+def add_views(app, post_ids):
+	backend = FileBackend(app)
+	for post_id in post_ids:
+		backend.add(post_id)
+
+
+def test_file_backend_is_shared_by_worker_processes(app):
+	context = multiprocessing.get_context('fork')
+	workers = [context.Process(target=add_views, args=(app, [1, 2] * VIEWS_PER_WORKER)) for _ in range(4)]
+	for worker in workers:
+		worker.start()
+	for worker in workers:
+		worker.join(30)
+		assert worker.exitcode == 0
+	backend = FileBackend(app)
+	assert backend.drain() == Counter({1: 4 * VIEWS_PER_WORKER, 2: 4 * VIEWS_PER_WORKER})
+	assert backend.drain() == Counter()
+
+
+def test_popular_lists_the_most_viewed_posts_first(client, make_user):
+	posts = add_posts(make_user(), 3)
+	db.session.add_all([PostViewCount(post_id=posts[0].id, views=2), PostViewCount(post_id=posts[1].id, views=9),
+						PostViewCount(post_id=posts[2].id, views=5)])
+	db.session.commit()
+	page = client.get('/popular').get_data(as_text=True)
+	assert page.index('Post 1') < page.index('Post 2') < page.index('Post 0')